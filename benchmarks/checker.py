@@ -0,0 +1,58 @@
+"""
+Multi-core document checking benchmark.
+
+Builds a text of correct sentences made of the bundled lexicon, one per line, with an error in its
+last line so that every line is checked, and checks it with Parser.parse_multiple and with
+DocumentChecker on 1 to N worker processes. Both have to find the same error. Prints the lines per
+second of each and the speed-up over parse_multiple; the worker start-up is measured apart.
+
+Usage:
+    python benchmarks/checker.py [--lines 200000] [--workers 1 2 4] [--chunk-size 1000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from polish_parser.checker import DocumentChecker
+from polish_parser.lexicon import get_lexicon
+from polish_parser.parser import Parser
+from live_typing import correct_sentences
+
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arguments.add_argument("--lines", type=int, default=200000)
+    arguments.add_argument("--workers", type=int, nargs="+", default=list(range(1, (os.cpu_count() or 1) + 1)))
+    arguments.add_argument("--chunk-size", type=int, default=1000)
+    arguments.add_argument("--seed", type=int, default=0)
+    args = arguments.parse_args()
+
+    rng = random.Random(args.seed)
+    parser = Parser(get_lexicon())
+    pool = correct_sentences(parser, 500, rng)
+    text = "\n".join([rng.choice(pool) for _ in range(args.lines - 1)] + ["ładna pies "])
+
+    start = time.perf_counter()
+    expected = parser.parse_multiple(text)
+    single = time.perf_counter() - start
+    print(f"{args.lines} lines, {os.cpu_count()} cores, chunks of {args.chunk_size} lines")
+    print(f"{'':<16}{'start-up s':>12}{'lines/s':>12}{'speed-up':>10}")
+    print(f"{'parse_multiple':<16}{'':>12}{args.lines / single:12.0f}{1:10.1f}")
+    for workers in args.workers:
+        with DocumentChecker(workers, args.chunk_size) as checker:
+            start = time.perf_counter()
+            checker.check("")
+            startup = time.perf_counter() - start
+            start = time.perf_counter()
+            result = checker.check(text)
+            elapsed = time.perf_counter() - start
+        if str(result) != str(expected):
+            sys.exit(f"{workers} workers found\n{result}\nparse_multiple\n{expected}")
+        print(f"{f'{workers} workers':<16}{startup:12.2f}{args.lines / elapsed:12.0f}{single / elapsed:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
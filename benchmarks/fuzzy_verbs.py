@@ -0,0 +1,80 @@
+"""
+Fuzzy verb suggestion benchmark.
+
+Builds synthetic lexicons of growing size (see synthetic_lexicon.py) and times the
+unrecognized-verb suggestion of the parser (grammar.similar_verb): Lexicon.similar, the walk over
+the trie alone (FormTrie.fuzzy without its scan, see trie.py) and a linear Levenshtein scan of every
+verb form, which is what the parser used to do. The one-off grouping of the forms the first
+Lexicon.similar scans is timed apart.
+
+Usage:
+    python benchmarks/fuzzy_verbs.py [--sizes 1000 10000 100000] [--queries 200]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from polish_parser.binary_lexicon import LexiconFile
+from polish_parser.lexicon import Lexicon
+from polish_parser.speech_parts import WordType, Person, Number, Gender, feature_masks
+from synthetic_lexicon import compile_synthetic
+
+LETTERS = "abcdefghijklmnoprstuwyzęóąśłżźćń"
+
+
+def misspell(word: str, rng: random.Random) -> str:
+    i = rng.randrange(len(word))
+    return rng.choice([word[:i] + word[i + 1:], word[:i] + rng.choice(LETTERS) + word[i + 1:]])
+
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arguments.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="lemmas")
+    arguments.add_argument("--queries", type=int, default=200)
+    args = arguments.parse_args()
+
+    try:
+        import Levenshtein
+    except ImportError:
+        Levenshtein = None
+
+    features = dict(gender=[Gender.M, Gender.F, None], number=[Number.SG], person=Person.THIRD)
+    masks = feature_masks(type=[WordType.VERB], **features)
+    print(f"{'lemmas':>8} {'forms':>9} {'first ms':>9} {'similar ms/query':>17} {'walk ms/query':>14} "
+          f"{'scan ms/query':>14}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            lexicon = Lexicon.from_file(LexiconFile.open(compile_synthetic(directory, size)))
+        rng = random.Random(1)
+        forms = sorted({w.word for w in lexicon.verbs.get(number=Number.SG, person=Person.THIRD)})
+        queries = [misspell(rng.choice(forms), rng) for _ in range(args.queries)]
+
+        start = time.perf_counter()
+        lexicon.similar(queries[0], [WordType.VERB], 2, **features)
+        first_time = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        for query in queries:
+            lexicon.similar(query, [WordType.VERB], 2, **features)
+        similar_time = (time.perf_counter() - start) / len(queries) * 1000
+        start = time.perf_counter()
+        for query in queries:
+            list(lexicon.trie._walk(query, 2, masks))
+        walk_time = (time.perf_counter() - start) / len(queries) * 1000
+
+        scan_time = float("nan")
+        if Levenshtein is not None:
+            start = time.perf_counter()
+            for query in queries:
+                [f for f in forms if Levenshtein.distance(f, query) <= 2]
+            scan_time = (time.perf_counter() - start) / len(queries) * 1000
+
+        print(f"{size:>8} {len(lexicon.strings):>9} {first_time:>9.0f} {similar_time:>17.3f} {walk_time:>14.3f} "
+              f"{scan_time:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
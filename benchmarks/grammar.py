@@ -0,0 +1,47 @@
+"""
+Grammar benchmark.
+
+Times Parser.parse_analyzed, the grammar alone, on sentences made of the bundled lexicon (see
+scaling.py) which are looked up in the lexicon beforehand: correct ones, and finished ones with
+their errors, whose suggestions aren't read and so not looked for. Prints microseconds per word.
+
+Usage:
+    python benchmarks/grammar.py [--sentences 5000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from polish_parser.lexicon import get_lexicon
+from polish_parser.parser import Parser
+from scaling import sentences
+
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arguments.add_argument("--sentences", type=int, default=5000)
+    arguments.add_argument("--repeat", type=int, default=5)
+    arguments.add_argument("--seed", type=int, default=0)
+    args = arguments.parse_args()
+
+    lexicon = get_lexicon()
+    parser = Parser(lexicon)
+    finished = sentences(lexicon, args.sentences, random.Random(args.seed))["parse"]
+    batches = {"correct": [s for s in finished if parser.parse(s) is None], "finished": finished}
+    for name, batch in batches.items():
+        analyzed = [(s.split(), parser.analyze_string(s, lexicon)) for s in batch]
+        n_words = sum(len(words) for words, _ in analyzed)
+        suggestions = dict()
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for words, analyses in analyzed:
+                parser.parse_analyzed(words, analyses, lexicon, suggestions)
+        elapsed = (time.perf_counter() - start) / args.repeat
+        print(f"{name:<10}{len(batch):>8} sentences{elapsed / n_words * 1e6:8.2f} us/word")
+
+
+if __name__ == "__main__":
+    main()
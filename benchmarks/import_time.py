@@ -0,0 +1,71 @@
+"""
+Cold import benchmark for polish_parser.
+
+Every sample runs in a fresh interpreter, so nothing is cached in sys.modules.
+Measures `import polish_parser`, the first parse (which loads the lexicon) and
+the first parse after a background warm-up.
+
+Usage:
+    python benchmarks/import_time.py [--runs 10] [--budget-ms 100]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+repo_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+SNIPPETS = {
+    "import polish_parser": """
+import time
+start = time.perf_counter()
+import polish_parser
+print(time.perf_counter() - start)
+""",
+    "import + first parse": """
+import time
+start = time.perf_counter()
+from polish_parser import Parser
+Parser().parse("kot je ")
+print(time.perf_counter() - start)
+""",
+    "first parse after warm-up": """
+import time
+from polish_parser import Parser, warm_up
+warm_up().join()
+start = time.perf_counter()
+Parser().parse("kot je ")
+print(time.perf_counter() - start)
+""",
+}
+
+
+def sample(snippet: str) -> float:
+    output = subprocess.run([sys.executable, "-c", snippet], cwd=repo_dir, check=True,
+                            capture_output=True, text=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arguments.add_argument("--runs", type=int, default=10)
+    arguments.add_argument("--budget-ms", type=float, default=100.0, help="fail if the median import is slower")
+    args = arguments.parse_args()
+
+    # compile the lexicon up front, so the first sample doesn't pay for it
+    sample(SNIPPETS["import + first parse"])
+
+    medians = dict()
+    for name, snippet in SNIPPETS.items():
+        times = [sample(snippet) * 1000 for _ in range(args.runs)]
+        medians[name] = statistics.median(times)
+        print(f"{name:<28} median {medians[name]:8.2f} ms   min {min(times):8.2f} ms   max {max(times):8.2f} ms")
+
+    if medians["import polish_parser"] > args.budget_ms:
+        print(f"Import is over the {args.budget_ms:.0f} ms budget.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Live typing benchmark for the checker.
+
+Builds documents of correct sentences, one per line, and types one more sentence character by
+character at the end and in the middle of them. Every keystroke is checked with Document.edit
+and, like the dashboard did, with Parser.parse_multiple on the whole text; both have to give the
+same result. Prints the mean milliseconds per keystroke for every document length.
+
+Usage:
+    python benchmarks/live_typing.py [--lines 10 100 1000 10000] [--seed 0]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from polish_parser.document import Document
+from polish_parser.lexicon import get_lexicon
+from polish_parser.parser import Parser
+from scaling import sentences
+
+
+def correct_sentences(parser: Parser, k: int, rng: random.Random) -> list[str]:
+    found = list()
+    while len(found) < k:
+        found.extend(s.strip() for s in sentences(parser.lexicon, k, rng)["parse"] if parser.parse(s) is None)
+    return found[:k]
+
+
+def type_sentence(parser: Parser, lines: list[str], row: int, sentence: str) -> tuple[float, float]:
+    """Mean seconds per keystroke of Document.edit and of parse_multiple, typing the sentence as a new line."""
+    text = "\n".join(lines[:row] + [""] + lines[row:])
+    document = Document(text, parser)
+    offset = sum(len(line) + 1 for line in lines[:row])
+    incremental = full = 0.0
+    for character in sentence:
+        start = time.perf_counter()
+        result = document.edit(offset, 0, character)
+        incremental += time.perf_counter() - start
+        text = text[:offset] + character + text[offset:]
+        start = time.perf_counter()
+        expected = parser.parse_multiple(text)
+        full += time.perf_counter() - start
+        if str(result) != str(expected):
+            raise AssertionError(f"Document and parse_multiple differ after typing {text[:offset + 1]!r}")
+        offset += 1
+    return incremental / len(sentence), full / len(sentence)
+
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arguments.add_argument("--lines", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    arguments.add_argument("--seed", type=int, default=0)
+    args = arguments.parse_args()
+
+    rng = random.Random(args.seed)
+    parser = Parser(get_lexicon())
+    pool = correct_sentences(parser, 500, rng)
+    sentence = rng.choice(pool) + " "
+    print(f"{'lines':>8}{'where':>8}{'edit ms':>12}{'parse_multiple ms':>20}")
+    for n_lines in args.lines:
+        lines = [rng.choice(pool) for _ in range(n_lines)]
+        for where, row in (("end", n_lines), ("middle", n_lines // 2)):
+            incremental, full = type_sentence(parser, lines, row, sentence)
+            print(f"{n_lines:>8}{where:>8}{incremental * 1000:12.3f}{full * 1000:20.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Load test of the checking service.
+
+Starts python -m polish_parser.server on a free port (or uses one already running, --port) and
+sends it texts of a few sentences made of the bundled lexicon, some with a misspelled verb, from
+many concurrent keep-alive connections, each sending its next request when the last is answered.
+Prints the requests per second, the p50/p95/p99 latency of the answered requests and the count of
+every status, and the batches the service parsed them in.
+
+Usage:
+    python benchmarks/load_test.py [--connections 64] [--requests 5000] [--lines 3] [--port PORT]
+                                   [-- server arguments, e.g. --window 10 --max-pending 100]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from polish_parser.parser import Parser
+from live_typing import correct_sentences
+from scaling import sentences
+
+
+async def request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, method: str, path: str,
+                  payload: dict | None = None) -> tuple[int, dict]:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8") if payload is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()).strip():
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def client(port: int, texts: list[str], latencies: list[float], statuses: Counter):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        for text in texts:
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, "POST", "/check", {"text": text})
+            statuses[status] += 1
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def wait_ready(port: int, service: subprocess.Popen | None, seconds: float = 60):
+    deadline = time.perf_counter() + seconds
+    while True:
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            await request(reader, writer, "GET", "/health")
+            writer.close()
+            return
+        except ConnectionError:
+            if time.perf_counter() > deadline or service is not None and service.poll() is not None:
+                raise
+            await asyncio.sleep(0.1)
+
+
+async def load(args, texts: list[str], service: subprocess.Popen | None):
+    await wait_ready(args.port, service)
+    latencies, statuses = list(), Counter()
+    per_connection = [texts[i::args.connections] for i in range(args.connections)]
+    start = time.perf_counter()
+    await asyncio.gather(*(client(args.port, chunk, latencies, statuses) for chunk in per_connection))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection("127.0.0.1", args.port)
+    _, stats = await request(reader, writer, "GET", "/stats")
+    writer.close()
+    print(f"{len(texts)} requests of {args.lines} lines from {args.connections} connections in {elapsed:.1f} s")
+    print(f"{len(texts) / elapsed:.0f} requests/s, statuses {dict(sorted(statuses.items()))}")
+    if len(latencies) > 1:
+        q = statistics.quantiles(latencies, n=100)
+        print(f"latency p50 {q[49] * 1000:.1f} ms, p95 {q[94] * 1000:.1f} ms, p99 {q[98] * 1000:.1f} ms")
+    print(f"{stats['batches']} batches, {stats['lines'] / max(stats['batches'], 1):.0f} lines each, "
+          f"token cache hit rate {stats['token_cache_hit_rate']:.1%}")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arguments.add_argument("--connections", type=int, default=64)
+    arguments.add_argument("--requests", type=int, default=5000)
+    arguments.add_argument("--lines", type=int, default=3, help="sentences of a text")
+    arguments.add_argument("--errors", type=float, default=0.3, help="share of the sentences with an error")
+    arguments.add_argument("--port", type=int, help="of a running service, one is started otherwise")
+    arguments.add_argument("--seed", type=int, default=0)
+    arguments.add_argument("server", nargs=argparse.REMAINDER, help="arguments of the started service")
+    args = arguments.parse_args()
+
+    rng = random.Random(args.seed)
+    parser = Parser()
+    pool = correct_sentences(parser, 500, rng)
+    mistakes = [s.strip() for s in sentences(parser.lexicon, 500, rng)["parse (misspelled verb)"]]
+    texts = ["\n".join(rng.choice(mistakes) if rng.random() < args.errors else rng.choice(pool)
+                       for _ in range(args.lines)) for _ in range(args.requests)]
+
+    service = None
+    if args.port is None:
+        args.port = free_port()
+        root = os.path.join(os.path.dirname(__file__), '..')
+        server_arguments = args.server[1:] if args.server[:1] == ["--"] else args.server
+        service = subprocess.Popen([sys.executable, "-m", "polish_parser.server", "--port", str(args.port),
+                                    *server_arguments], cwd=root)
+    try:
+        asyncio.run(load(args, texts, service))
+    finally:
+        if service is not None:
+            service.terminate()
+            service.wait()
+
+
+if __name__ == "__main__":
+    main()
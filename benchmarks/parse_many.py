@@ -0,0 +1,61 @@
+"""
+Batch parsing benchmark.
+
+Parses a batch of sentences made of the bundled lexicon (finished, with an unfinished last word and
+with a misspelled verb, see scaling.py, in equal parts) with a loop over Parser.parse and with
+Parser.parse_many, checks that both give the same results and prints their throughput, with and
+without reading the suggestions of the errors, as check.py and the server do. Every run has a
+Parser of its own, so none of them starts with the token cache another one filled.
+
+Usage:
+    python benchmarks/parse_many.py [--sentences 100000] [--seed 0]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from polish_parser.lexicon import get_lexicon
+from polish_parser.parser import Parser
+from scaling import sentences
+
+
+def timed(parse, batch: list[str], read: bool) -> tuple[list, float]:
+    parser = Parser()
+    start = time.perf_counter()
+    results = parse(parser, batch)
+    if read:
+        for result in results:
+            if result:
+                list(result.expected)
+    return results, time.perf_counter() - start
+
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arguments.add_argument("--sentences", type=int, default=100000)
+    arguments.add_argument("--seed", type=int, default=0)
+    args = arguments.parse_args()
+
+    rng = random.Random(args.seed)
+    kinds = sentences(get_lexicon(), args.sentences // 3 + 1, rng)
+    batch = [s for kind in kinds.values() for s in kind][:args.sentences]
+    rng.shuffle(batch)
+
+    print(f"{len(batch)} sentences, {len(set(w for s in batch for w in s.split()))} distinct words")
+    for read in (False, True):
+        expected, loop = timed(lambda parser, batch: [parser.parse(s) for s in batch], batch, read)
+        results, many = timed(Parser.parse_many, batch, read)
+        for sentence, result, parsed in zip(batch, results, expected):
+            if str(result) != str(parsed):
+                sys.exit(f"{sentence!r} parsed to\n{result}\nby parse_many, to\n{parsed}\nby parse")
+        suggestions = "suggestions read" if read else "suggestions unread"
+        print(f"{'parse loop':<12}{loop:8.1f} s{len(batch) / loop:10.0f} sentences/s  {suggestions}")
+        print(f"{'parse_many':<12}{many:8.1f} s{len(batch) / many:10.0f} sentences/s  {suggestions} "
+              f"({loop / many:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
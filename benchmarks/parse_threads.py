@@ -0,0 +1,85 @@
+"""
+Concurrency stress test for Parser.
+
+Parses a batch of sentences made of the bundled lexicon (finished, with an unfinished last word and
+with a misspelled verb, see scaling.py) sequentially, then again with one Parser shared by a thread
+pool, many times over and with the interpreter switching threads as often as it can. Every round
+starts a new Parser with a small token cache, so the threads fill and evict it at once, and calls
+parse, parse_all, parse_many and parse_many_all, the suggestions read. Every result has to be the
+same as the sequential one: the mismatches are printed and the script exits with status 1, so it
+serves as the regression check of the thread safety of Parser.
+
+Usage:
+    python benchmarks/parse_threads.py [--threads 8] [--rounds 20] [--sentences 300] [--cache-size 64]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from polish_parser.lexicon import get_lexicon
+from polish_parser.parser import Parser, Result
+from scaling import sentences
+
+CHUNK = 16  # sentences of a parse_many call
+
+
+def describe(result: Result | None) -> tuple | None:
+    return result and (result.position, result.length, result.reason, [(w.word, w.code) for w in result.expected])
+
+
+def run(parser: Parser, method: str, sentences: list[str]) -> list:
+    """Results of the method for every sentence, described to compare them."""
+    if method == "parse":
+        return [describe(parser.parse(s)) for s in sentences]
+    if method == "parse_all":
+        return [[describe(r) for r in parser.parse_all(s)] for s in sentences]
+    if method == "parse_many":
+        return [describe(r) for r in parser.parse_many(sentences)]
+    return [[describe(r) for r in results] for results in parser.parse_many_all(sentences)]
+
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arguments.add_argument("--threads", type=int, default=8)
+    arguments.add_argument("--rounds", type=int, default=20)
+    arguments.add_argument("--sentences", type=int, default=300, help="of every kind")
+    arguments.add_argument("--cache-size", type=int, default=64, help="tokens cached by the parser of a round")
+    arguments.add_argument("--seed", type=int, default=0)
+    args = arguments.parse_args()
+
+    rng = random.Random(args.seed)
+    batch = [s for kind in sentences(get_lexicon(), args.sentences, rng).values() for s in kind]
+    chunks = [batch[i:i + CHUNK] for i in range(0, len(batch), CHUNK)]
+    methods = ("parse", "parse_all", "parse_many", "parse_many_all")
+    serial = Parser()
+    expected = {(method, i): run(serial, method, chunk) for method in methods for i, chunk in enumerate(chunks)}
+
+    sys.setswitchinterval(1e-6)
+    mismatches = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        for round in range(args.rounds):
+            parser = Parser(cache_size=args.cache_size)
+            tasks = rng.sample(list(expected), len(expected))
+            for task, results in zip(tasks, pool.map(lambda task: run(parser, task[0], chunks[task[1]]), tasks)):
+                method, i = task
+                for sentence, result, wanted in zip(chunks[i], results, expected[task]):
+                    if result != wanted:
+                        mismatches += 1
+                        if mismatches <= 10:
+                            print(f"Round {round}, {method}: {sentence!r} gave\n  {result}\nexpected\n  {wanted}",
+                                  file=sys.stderr)
+    elapsed = time.perf_counter() - start
+    n_calls = args.rounds * len(batch) * len(methods)
+    if mismatches:
+        sys.exit(f"{mismatches} of {n_calls} results on {args.threads} threads differ from sequential parsing")
+    print(f"{n_calls} results on {args.threads} threads sharing one Parser match sequential parsing "
+          f"({elapsed:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Lexicon reload benchmark.
+
+Generates a synthetic lexicon (see synthetic_lexicon.py), compiles it, then appends rows to its
+CSVs the way editors do and measures binary_lexicon.refresh, which adds them to the compiled
+lexicon, against compiling the CSVs again. Checks that a word of every appended row is found.
+
+Usage:
+    python benchmarks/reload.py [--sizes 1000 10000 100000] [--rows 1 10 100]
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from polish_parser.binary_lexicon import SOURCES, LexiconFile, compile_csv, read_csv, refresh
+from synthetic_lexicon import StemModel, generate, respell, stem_groups
+
+
+def append_rows(directory: str, n_rows: int, model: StemModel, rng: random.Random) -> list[str]:
+    """Appends rows with new stems to random CSVs of the lexicon, returns a form of every row."""
+    forms = list()
+    for _ in range(n_rows):
+        name, file = rng.choice([(n, f) for n, f in SOURCES.items() if n != "pronoun"])
+        columns, rows = read_csv(os.path.join(directory, file))
+        groups = stem_groups(name, columns)
+        row = respell(rng.choice(rows), groups, [model.stem(rng) for _ in groups])
+        with open(os.path.join(directory, file), "a", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerow(row)
+        forms.append(next(v for v in row if v.strip()))
+    return forms
+
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arguments.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="lemmas")
+    arguments.add_argument("--rows", type=int, nargs="+", default=[1, 10, 100], help="rows appended at once")
+    arguments.add_argument("--seed", type=int, default=0)
+    args = arguments.parse_args()
+
+    rng = random.Random(args.seed)
+    model = StemModel()
+    print(f"{'lemmas':>8}{'rows':>8}{'refresh ms':>14}{'compile ms':>14}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            generate(directory, size, args.seed)
+            path = os.path.join(directory, "lexicon.bin")
+            compile_csv(directory).write(path)
+            lexicon_file = LexiconFile.open(path)
+            for n_rows in args.rows:
+                forms = append_rows(directory, n_rows, model, rng)
+                start = time.perf_counter()
+                lexicon_file = refresh(lexicon_file, path, directory)
+                refresh_time = time.perf_counter() - start
+                missing = [f for f in forms if lexicon_file.strings.find(f.strip()) < 0]
+                if missing:
+                    raise AssertionError(f"Appended forms missing after the refresh: {missing}")
+                start = time.perf_counter()
+                compile_csv(directory).to_bytes()
+                compile_time = time.perf_counter() - start
+                print(f"{size:>8}{n_rows:>8}{refresh_time * 1000:14.1f}{compile_time * 1000:14.1f}")
+
+
+if __name__ == "__main__":
+    main()
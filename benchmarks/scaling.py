@@ -0,0 +1,147 @@
+"""
+Lexicon scaling benchmark.
+
+Generates synthetic lexicons of growing size (see synthetic_lexicon.py) and measures at each
+size: compiling the CSVs, Lexicon.from_file on the compiled file, get_one, get_all, the lemma
+lookups, filtered get (for a word, and over the whole table with the query cache cleared) and
+Parser.parse on finished sentences, on sentences ending in an unfinished word and on
+misspelled verbs.
+
+Prints the latency of every operation per size and its scaling exponent k, time ~ lemmas^k
+between the smallest and the largest size, and can save the numbers as JSON to hold later
+lexicon changes against. 1M lemmas are supported but compiling them needs several GB of memory.
+
+Usage:
+    python benchmarks/scaling.py [--sizes 1000 10000 100000] [--samples 500] [--json results.json]
+"""
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from polish_parser.binary_lexicon import LexiconFile, compile_csv
+from polish_parser.lexicon import Lexicon
+from polish_parser.parser import Parser
+from polish_parser.speech_parts import Conjugation, Number, Person
+from synthetic_lexicon import generate
+
+
+def forms_of(lexicon: Lexicon, part: str, column: str) -> list[str]:
+    table = getattr(lexicon, part + "s").table
+    ids = table.cells[:, table.column_index[column]]
+    return [lexicon.strings[i] for i in ids.tolist() if i >= 0]
+
+
+def sample_forms(lexicon: Lexicon, part: str, k: int, rng: random.Random) -> list[str]:
+    table = getattr(lexicon, part + "s").table
+    cells = table.cells.ravel()
+    return [lexicon.strings[int(cells[i])] for i in rng.choices(range(cells.size), k=k * 2) if cells[i] >= 0][:k]
+
+
+def sentences(lexicon: Lexicon, k: int, rng: random.Random) -> dict[str, list[str]]:
+    """Subject, verb and object sentences made of the lexicon: finished, with an unfinished last word, misspelled."""
+    gender = rng.choice("MFN")
+    adjectives = forms_of(lexicon, "adjective", f"SG_NOM_{gender}")
+    subjects = forms_of(lexicon, "noun", f"SG_NOM_{gender}")
+    verbs = forms_of(lexicon, "verb", "SG_GEN_-_3_PRES_IND")
+    objects = forms_of(lexicon, "noun", "SG_GEN_M")
+    finished, unfinished, misspelled = list(), list(), list()
+    for _ in range(k):
+        subject = f"{rng.choice(adjectives)} {rng.choice(subjects)}"
+        verb = rng.choice(verbs)
+        noun = rng.choice(objects)
+        finished.append(f"{subject} {verb} {noun} ")
+        unfinished.append(f"{subject} {verb} {noun[:max(1, len(noun) // 2)]}")
+        i = rng.randrange(len(verb))
+        misspelled.append(f"{subject} {verb[:i] + verb[i + 1:]} ")
+    return {"parse": finished, "parse (unfinished word)": unfinished, "parse (misspelled verb)": misspelled}
+
+
+def per_call(function: Callable, arguments: list) -> float:
+    """Mean seconds of a call over the arguments."""
+    start = time.perf_counter()
+    for argument in arguments:
+        function(argument)
+    return (time.perf_counter() - start) / len(arguments)
+
+
+def measure(path: str, samples: int, rng: random.Random) -> dict[str, float]:
+    results = dict()
+    results["from_file"] = statistics.median(
+        per_call(lambda _: Lexicon.from_file(LexiconFile.open(path)), [None]) for _ in range(5))
+    lexicon = Lexicon.from_file(LexiconFile.open(path))
+
+    nouns = sample_forms(lexicon, "noun", samples, rng)
+    adjectives = sample_forms(lexicon, "adjective", samples, rng)
+    verbs = sample_forms(lexicon, "verb", samples, rng)
+    results["get_one"] = statistics.mean([per_call(lexicon.nouns.get_one, nouns),
+                                          per_call(lexicon.adjectives.get_one, adjectives),
+                                          per_call(lexicon.verbs.get_one, verbs)])
+    # verbs have no get_all
+    results["get_all"] = statistics.mean([per_call(lexicon.nouns.get_all, nouns),
+                                          per_call(lexicon.adjectives.get_all, adjectives)])
+    results["get_lemmas"] = per_call(lexicon.verbs.get_lemmas, verbs)
+    lemmas = [lemma.word for verb in verbs for lemma in lexicon.verbs.get_lemmas(verb)]
+    results["get_paradigm"] = per_call(lexicon.verbs.get_paradigm, lemmas)
+    # distinct words, so every query misses the cache
+    words = list(dict.fromkeys(verbs))
+    results["get(word=...)"] = per_call(lambda w: lexicon.verbs.get(word=w, person=Person.THIRD), words)
+
+    def select_all(_):
+        lexicon.nouns.cache.clear()
+        lexicon.nouns.get(conjugation=Conjugation.NOM, number=Number.SG)
+    results["get(filters)"] = per_call(select_all, [None] * 5)
+
+    for name, batch in sentences(lexicon, samples, rng).items():
+        parser = Parser(lexicon)
+        results[name] = per_call(parser.parse, batch)
+    return results
+
+
+def report(sizes: list[int], results: dict[int, dict[str, float]]):
+    operations = list(results[sizes[0]])
+    print(f"{'ms':<26}" + "".join(f"{size:>12}" for size in sizes) + f"{'k':>8}")
+    for operation in operations:
+        times = [results[size][operation] * 1000 for size in sizes]
+        exponent = ""
+        if len(sizes) > 1 and times[0] > 0:
+            exponent = f"{math.log(times[-1] / times[0]) / math.log(sizes[-1] / sizes[0]):8.2f}"
+        print(f"{operation:<26}" + "".join(f"{t:12.3f}" for t in times) + exponent)
+
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arguments.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="lemmas")
+    arguments.add_argument("--samples", type=int, default=500, help="queries per operation")
+    arguments.add_argument("--seed", type=int, default=0)
+    arguments.add_argument("--json", help="save the results into this file")
+    args = arguments.parse_args()
+
+    results = dict()
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            rows = generate(directory, size, args.seed)
+            path = os.path.join(directory, "lexicon.bin")
+            start = time.perf_counter()
+            compile_csv(directory).write(path)
+            compile_time = time.perf_counter() - start
+            results[size] = {"compile": compile_time, **measure(path, args.samples, random.Random(args.seed))}
+            n_strings = len(LexiconFile.open(path).strings)
+        print(f"{size} lemmas: {', '.join(f'{n} {name}s' for name, n in rows.items())}, {n_strings} forms",
+              file=sys.stderr)
+
+    report(args.sizes, results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({str(size): r for size, r in results.items()}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Suggestion benchmark.
+
+Parses sentences with errors (an unfinished last word or a misspelled verb, see scaling.py) with
+Parser.parse_many against the bundled lexicon and synthetic ones of growing size, and times the
+diagnostics alone, reading their suggestions (the best max_suggestions of them, see
+suggestions.py) and reading all the candidates instead. Prints the seconds of each and the mean
+and largest number of suggestions of a diagnostic. Reading is mostly the fuzzy search of the
+misspelled verbs, which has to see every candidate either way. Also times the ranking alone (see
+suggestions.rank) on every noun of the bundled lexicon, after a frequent word and after none.
+
+Usage:
+    python benchmarks/suggestions.py [--sizes 10000 100000] [--sentences 500]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from polish_parser.binary_lexicon import LexiconFile
+from polish_parser.lexicon import Lexicon, get_lexicon
+from polish_parser.parser import Parser
+from polish_parser.speech_parts import WordType
+from polish_parser.suggestions import get_successor_index, rank
+from scaling import sentences
+from synthetic_lexicon import compile_synthetic
+
+
+def measure(name: str, lexicon: Lexicon, n_sentences: int, seed: int):
+    kinds = sentences(lexicon, n_sentences // 2 + 1, random.Random(seed))
+    batch = (kinds["parse (unfinished word)"] + kinds["parse (misspelled verb)"])[:n_sentences]
+    row = f"{name:<16}"
+    for limit in (Parser().max_suggestions, None):
+        parser = Parser(lexicon, len(lexicon.strings) if limit is None else limit)
+        start = time.perf_counter()
+        results = [r for r in parser.parse_many(batch) if r]
+        parsed = time.perf_counter() - start
+        start = time.perf_counter()
+        sizes = [len(r.expected) for r in results]
+        read = time.perf_counter() - start
+        if limit is not None:
+            row += f"{len(results):>8}{parsed:10.2f}"
+        row += f"{read:10.2f}{sum(sizes) / len(sizes):8.1f}{max(sizes):8}"
+    print(row)
+
+
+def rank_cost(lexicon: Lexicon):
+    candidates = [(0, w) for w in lexicon.iter_complete("", [WordType.NOUN])]
+    for previous in ("w", None):
+        start = time.perf_counter()
+        rank(candidates, Parser().max_suggestions, previous)
+        elapsed = time.perf_counter() - start
+        print(f"rank after {previous!r}: {len(candidates)} candidates, {elapsed / len(candidates) * 1e6:.2f} us each")
+
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arguments.add_argument("--sizes", type=int, nargs="*", default=[10000, 100000], help="lemmas")
+    arguments.add_argument("--sentences", type=int, default=500)
+    arguments.add_argument("--seed", type=int, default=0)
+    args = arguments.parse_args()
+
+    get_successor_index()  # made once, not with the first suggestions read
+    print(f"{'':<24}{'parse':>10}{'top ' + str(Parser().max_suggestions):>26}{'all':>26}")
+    print(f"{'lexicon':<16}{'errors':>8}{'s':>10}" + f"{'read s':>10}{'mean':>8}{'max':>8}" * 2)
+    measure("bundled", get_lexicon(), args.sentences, args.seed)
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            lexicon = Lexicon.from_file(LexiconFile.open(compile_synthetic(directory, size, args.seed)))
+            measure(f"{size} lemmas", lexicon, args.sentences, args.seed)
+    rank_cost(get_lexicon())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Synthetic lexicon generator.
+
+Writes nouns.csv, verbs.csv, adjectives.csv and pronouns.csv in the layout of the bundled
+ones, scaled to a number of lemmas. The bundled rows come first; the others reuse their
+paradigms (the endings) with new stems drawn from a character bigram chain over the bundled
+stems, so the forms look Polish and share prefixes the way real ones do. The lemmas are split
+between nouns, verbs and adjectives like in the bundled lexicon (a noun row holds a lemma of
+every gender), pronouns are a closed class and are copied as they are.
+
+With --dump the lexicon is written as an SGJP/PoliMorf style tab separated dump instead,
+the input of polish_parser.importer. Like in the real dumps, the past tense of the 1st and
+2nd person and the conditional are left out, the importer builds them.
+
+Usage:
+    python benchmarks/synthetic_lexicon.py out_dir [--lemmas 100000] [--seed 0]
+    python benchmarks/synthetic_lexicon.py dump.tab --dump [--lemmas 100000] [--seed 0]
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+from typing import Iterator
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from polish_parser.binary_lexicon import SOURCES, module_dir, read_csv, compile_csv
+
+OPEN_CLASSES = ("noun", "verb", "adjective")
+
+
+class StemModel:
+    """Character bigram chain over the stems of the bundled lexicon."""
+
+    def __init__(self, directory: str = module_dir):
+        self.successors: dict[str, list[str]] = dict()
+        for name, file in SOURCES.items():
+            columns, rows = read_csv(os.path.join(directory, file))
+            for row in rows:
+                for group in stem_groups(name, columns):
+                    stem = common_stem([row[i] for i in group if i < len(row)])
+                    for a, b in zip("^" + stem, stem + "$"):
+                        self.successors.setdefault(a, []).append(b)
+
+    def stem(self, rng: random.Random) -> str:
+        stem, character = "", "^"
+        while True:
+            character = rng.choice(self.successors[character])
+            if character == "$":
+                if len(stem) >= 2:
+                    return stem
+                stem, character = "", "^"
+                continue
+            stem += character
+
+
+def stem_groups(name: str, columns: list[str]) -> list[list[int]]:
+    """Columns sharing a stem: the gender blocks of a noun row are separate lemmas, other rows are one lemma."""
+    if name != "noun":
+        return [list(range(len(columns)))]
+    groups: dict[str, list[int]] = dict()
+    for i, column in enumerate(columns):
+        groups.setdefault(column.rsplit("_", 1)[-1], []).append(i)
+    return list(groups.values())
+
+
+def common_stem(forms: list[str]) -> str:
+    return os.path.commonprefix([f.strip() for f in forms if f.strip()])
+
+
+def respell(row: list[str], groups: list[list[int]], stems: list[str]) -> list[str]:
+    """The row with the stem of every group replaced."""
+    row = list(row)
+    for group, stem in zip(groups, stems):
+        old = common_stem([row[i] for i in group if i < len(row)])
+        for i in group:
+            if i < len(row) and row[i].strip():
+                row[i] = stem + row[i].strip()[len(old):]
+    return row
+
+
+def synthetic_rows(name: str, columns: list[str], templates: list[list[str]], n_rows: int,
+                   model: StemModel, rng: random.Random) -> Iterator[list[str]]:
+    """The bundled rows, then new ones until there are n_rows, every stem used once."""
+    groups = stem_groups(name, columns)
+    yield from templates[:n_rows]
+    stems = {common_stem([row[i] for i in group if i < len(row)]) for row in templates for group in groups}
+    for _ in range(n_rows - len(templates)):
+        new_stems = list()
+        while len(new_stems) < len(groups):
+            stem = model.stem(rng)
+            if stem not in stems:
+                stems.add(stem)
+                new_stems.append(stem)
+        yield respell(rng.choice(templates), groups, new_stems)
+
+
+def part_rows(n_lemmas: int, directory: str = module_dir) -> dict[str, int]:
+    """Rows of every part for the number of lemmas, in the proportions of the bundled lexicon."""
+    lemmas, rows = dict(), dict()
+    for name, file in SOURCES.items():
+        columns, templates = read_csv(os.path.join(directory, file))
+        rows[name] = len(templates)
+        lemmas[name] = len(templates) * len(stem_groups(name, columns))
+    total = sum(lemmas[name] for name in OPEN_CLASSES)
+    for name in OPEN_CLASSES:
+        per_row = lemmas[name] // rows[name]
+        rows[name] = max(rows[name], round(n_lemmas * lemmas[name] / total / per_row))
+    return rows
+
+
+def generate(out_dir: str, n_lemmas: int, seed: int = 0, directory: str = module_dir) -> dict[str, int]:
+    """Writes the four CSVs of a lexicon with about n_lemmas lemmas into out_dir, returns the rows of every part."""
+    rng = random.Random(seed)
+    model = StemModel(directory)
+    rows = part_rows(n_lemmas, directory)
+    os.makedirs(out_dir, exist_ok=True)
+    for name, file in SOURCES.items():
+        columns, templates = read_csv(os.path.join(directory, file))
+        with open(os.path.join(out_dir, file), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows(synthetic_rows(name, columns, templates, rows[name], model, rng))
+    return rows
+
+
+CASE_TAGS = {"NOM": "nom", "GEN": "gen", "DAT": "dat", "ACC": "acc", "INS": "inst", "LOC": "loc", "VOC": "voc"}
+NOUN_GENDER_TAGS = {"M": "m3", "F": "f", "N": "n"}
+ADJECTIVE_GENDER_TAGS = {("SG", "M"): "m1.m2.m3", ("SG", "F"): "f", ("SG", "N"): "n",
+                         ("PL", "M"): "m1", ("PL", "F"): "m2.m3.f", ("PL", "N"): "n"}
+PRAET_GENDER_TAGS = {("SG", "M"): "m1.m2.m3", ("SG", "F"): "f", ("SG", "N"): "n",
+                     ("PL", "M"): "m1", ("PL", "F"): "m2.m3.f.n"}
+PERSON_TAGS = {"1": "pri", "2": "sec", "3": "ter"}
+
+
+def dump_lines(name: str, columns: list[str], row: list[str]) -> Iterator[tuple[str, str, str]]:
+    """(form, lemma, tag) of the forms of a row a dictionary dump would list."""
+    forms = {c: f.strip() for c, f in zip(columns, row) if f.strip()}
+    if name == "verb":
+        lemma = forms.get("VERB")
+        if lemma is None:
+            return
+        yield lemma, lemma, "inf:imperf"
+        for column, form in forms.items():
+            if column == "VERB":
+                continue
+            number, _, gender, person, tense, _ = column.split("_")
+            if tense == "PRES":
+                yield form, lemma, f"fin:{number.lower()}:{PERSON_TAGS[person]}:imperf"
+            elif tense == "PAST" and person == "3":
+                yield form, lemma, f"praet:{number.lower()}:{PRAET_GENDER_TAGS[number, gender]}:imperf"
+        # a stem of its own before the agglutinate, like 'mogł' in 'mogłem' next to 'mógł'
+        past, first = forms.get("SG_GEN_M_3_PAST_IND"), forms.get("SG_GEN_M_1_PAST_IND", "")
+        if past and first.endswith("em") and first[:-2] != past:
+            yield first[:-2], lemma, "praet:sg:m1.m2.m3:imperf:agl"
+        return
+    for group in stem_groups(name, columns):
+        gender = columns[group[0]].rsplit("_", 1)[-1]
+        lemma = forms.get(f"SG_NOM_{gender}" if name == "noun" else "SG_NOM_M")
+        if lemma is None:
+            continue
+        for column in (columns[i] for i in group):
+            if column not in forms:
+                continue
+            number, case, gender = column.split("_")
+            if name == "noun":
+                tag = f"subst:{number.lower()}:{CASE_TAGS[case]}:{NOUN_GENDER_TAGS[gender]}"
+            else:
+                tag = f"adj:{number.lower()}:{CASE_TAGS[case]}:{ADJECTIVE_GENDER_TAGS[number, gender]}:pos"
+            yield forms[column], lemma, tag
+
+
+def write_dump(path: str, n_lemmas: int, seed: int = 0, directory: str = module_dir) -> int:
+    """Writes a lexicon with about n_lemmas lemmas as a dictionary dump, returns the number of lines."""
+    rng = random.Random(seed)
+    model = StemModel(directory)
+    rows = part_rows(n_lemmas, directory)
+    n_lines = 0
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        for name, file in SOURCES.items():
+            columns, templates = read_csv(os.path.join(directory, file))
+            for row in synthetic_rows(name, columns, templates, rows[name], model, rng):
+                for line in dump_lines(name, columns, row):
+                    f.write("\t".join(line) + "\n")
+                    n_lines += 1
+    return n_lines
+
+
+def compile_synthetic(out_dir: str, n_lemmas: int, seed: int = 0) -> str:
+    """Generates a lexicon into out_dir and compiles it, returns the path of the compiled file."""
+    generate(out_dir, n_lemmas, seed)
+    path = os.path.join(out_dir, "lexicon.bin")
+    compile_csv(out_dir).write(path)
+    return path
+
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arguments.add_argument("out_dir")
+    arguments.add_argument("--lemmas", type=int, default=100000)
+    arguments.add_argument("--seed", type=int, default=0)
+    arguments.add_argument("--dump", action="store_true", help="write a dictionary dump into out_dir instead")
+    args = arguments.parse_args()
+
+    if args.dump:
+        print(f"Wrote {write_dump(args.out_dir, args.lemmas, args.seed)} lines into {args.out_dir}")
+        return
+    rows = generate(args.out_dir, args.lemmas, args.seed)
+    print(f"Wrote {', '.join(f'{n} {name}s' for name, n in rows.items())} into {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Token cache benchmark.
+
+Makes a text whose words are drawn from the forms of the bundled lexicon with Zipf's law, like
+the words of real text, and parses it line by line with Parser.parse_multiple at several token
+cache sizes (0 turns the cache off). Prints the lines per second and the hit rate of each size.
+
+Usage:
+    python benchmarks/token_cache.py [--lines 20000] [--sizes 0 100 1000 100000] [--zipf 1.0]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from itertools import accumulate
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from polish_parser.lexicon import get_lexicon
+from polish_parser.parser import Parser
+
+
+def zipf_text(n_lines: int, exponent: float, rng: random.Random) -> str:
+    vocabulary = list(get_lexicon().strings)
+    rng.shuffle(vocabulary)
+    weights = list(accumulate(1 / rank ** exponent for rank in range(1, len(vocabulary) + 1)))
+    return "\n".join(" ".join(rng.choices(vocabulary, cum_weights=weights, k=rng.randint(3, 8))) + " "
+                     for _ in range(n_lines))
+
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arguments.add_argument("--lines", type=int, default=20000)
+    arguments.add_argument("--sizes", type=int, nargs="+", default=[0, 100, 1000, 100000])
+    arguments.add_argument("--zipf", type=float, default=1.0, help="exponent of the word frequencies")
+    arguments.add_argument("--seed", type=int, default=0)
+    args = arguments.parse_args()
+
+    lines = zipf_text(args.lines, args.zipf, random.Random(args.seed)).split("\n")
+    print(f"{args.lines} lines, {len(set(w for line in lines for w in line.split()))} distinct words")
+    print(f"{'cache size':>10}{'lines/s':>10}{'hit rate':>10}")
+    for size in args.sizes:
+        parser = Parser(cache_size=size)
+        start = time.perf_counter()
+        for line in lines:
+            parser.parse_multiple(line)
+        elapsed = time.perf_counter() - start
+        print(f"{size:>10}{len(lines) / elapsed:10.0f}{parser.cache_info().hit_rate:10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Multi-process lexicon memory benchmark (Linux, reads /proc).
+
+Starts pools of parser workers over a synthetic lexicon (see synthetic_lexicon.py) in two modes:
+
+- attached: the parent publishes the compiled lexicon once and every worker maps it read-only
+  (publish_lexicon / attach_lexicon),
+- private: every worker reads the compiled file into memory of its own, like a process holding
+  its own copy of the tables.
+
+Every worker parses sentences and then reads every section of the lexicon, so all of it is
+resident in all of them. Prints the worker start-up time and the summed proportional set size
+(shared pages are split between the processes mapping them) of the pool for every worker count.
+
+Usage:
+    python benchmarks/workers.py [--lemmas 100000] [--workers 1 2 4 8] [--sentences 200]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from polish_parser.binary_lexicon import LexiconFile
+from polish_parser.lexicon import Lexicon, attach_lexicon, publish_lexicon
+from polish_parser.parser import Parser
+from polish_parser.speech_parts import get_lexicon_file
+from scaling import sentences
+from synthetic_lexicon import compile_synthetic
+
+
+def worker(path: str, mode: str, batch: list[str], results: multiprocessing.Queue, done: multiprocessing.Event):
+    start = time.perf_counter()
+    if mode == "attached":
+        lexicon = attach_lexicon(path)
+        lexicon_file = get_lexicon_file()
+    else:
+        with open(path, "rb") as f:
+            lexicon_file = LexiconFile.from_buffer(f.read())
+        lexicon = Lexicon.from_file(lexicon_file)
+    startup = time.perf_counter() - start
+    parser = Parser(lexicon)
+    for sentence in batch:
+        parser.parse(sentence)
+    for array in lexicon_file.arrays.values():
+        array.view(np.uint8).sum()
+    results.put((os.getpid(), startup))
+    # stay alive until the parent has measured every worker
+    done.wait()
+
+
+def pss(pid: int) -> int:
+    """Proportional set size of the process in bytes."""
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                return int(line.split()[1]) * 1024
+    raise ValueError(f"No Pss for process {pid}")
+
+
+def run_pool(path: str, mode: str, n_workers: int, batch: list[str]) -> tuple[float, int]:
+    """Mean start-up seconds of the workers and their summed PSS."""
+    context = multiprocessing.get_context("spawn")
+    results, done = context.Queue(), context.Event()
+    workers = [context.Process(target=worker, args=(path, mode, batch, results, done)) for _ in range(n_workers)]
+    for process in workers:
+        process.start()
+    startups = dict(results.get() for _ in workers)
+    total = sum(pss(pid) for pid in startups)
+    done.set()
+    for process in workers:
+        process.join()
+    return statistics.mean(startups.values()), total
+
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arguments.add_argument("--lemmas", type=int, default=100000)
+    arguments.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    arguments.add_argument("--sentences", type=int, default=200, help="parsed by every worker")
+    arguments.add_argument("--seed", type=int, default=0)
+    args = arguments.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = compile_synthetic(directory, args.lemmas, args.seed)
+        lexicon = attach_lexicon(path)
+        published = publish_lexicon()
+        batch = sentences(lexicon, args.sentences, random.Random(args.seed))["parse"]
+        print(f"{os.path.getsize(path) / 2 ** 20:.0f} MB lexicon, {args.lemmas} lemmas")
+        print(f"{'mode':<10}{'workers':>8}{'start-up ms':>14}{'PSS MB':>10}{'per worker':>12}")
+        for mode in ("attached", "private"):
+            for n_workers in args.workers:
+                startup, total = run_pool(published, mode, n_workers, batch)
+                print(f"{mode:<10}{n_workers:>8}{startup * 1000:14.1f}{total / 2 ** 20:10.0f}"
+                      f"{total / n_workers / 2 ** 20:12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,13 +8,20 @@ from corpus_analyzer import get_analyzer
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from polish_parser.document import Document
 from polish_parser.parser import Parser, ResultMultiple
+from polish_parser.lexicon import warm_up, watch
 from polish_parser.polish_word_pairs import get_word_pairs_analyzer
 from config import (
     PAGE_TITLE, PAGE_ICON, DEFAULT_TOP_N_WORDS, 
     DEFAULT_TOP_CONNECTIONS, DEFAULT_MIN_CONNECTION_FREQ
 )
 
+# Load the parser's lexicon in the background while the page renders
+warm_up()
+# Pick up rows added to the lexicon CSVs without restarting the app
+watch()
+
 # Page configuration
 st.set_page_config(
     page_title=PAGE_TITLE,
@@ -260,6 +267,9 @@ if show_polish_checker:
     
     # Create parser instance
     parser = Parser()
+    if 'checker_document' not in st.session_state:
+        # keeps the parsed lines between reruns, only the changed ones are checked again
+        st.session_state.checker_document = Document(parser=parser)
     
     # Main text input - using text_input with key binding for immediate response
     st.markdown("### 📝 Wpisz zdanie")
@@ -290,7 +300,7 @@ if show_polish_checker:
     
     # Parse text on every change
     if user_input and user_input.strip():
-        result = parser.parse_multiple(user_input)
+        result = st.session_state.checker_document.set_text(user_input)
         
         with result_container:
             if result is None:
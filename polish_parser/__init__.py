@@ -1,2 +1,6 @@
 from .speech_parts import Nouns, Verbs, Word, Conjugation, WordType
+from .lexicon import (Lexicon, LexiconWatcher, attach_lexicon, get_lexicon, publish_lexicon, reload_lexicon, warm_up,
+                      watch)
 from .parser import Result, Parser
+from .document import Document
+from .checker import DocumentChecker
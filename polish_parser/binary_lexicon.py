@@ -0,0 +1,667 @@
+"""
+Compiled binary lexicon.
+
+All four CSV tables are compiled into a single file made of flat arrays:
+
+- a string table (UTF-8 blob + offsets) shared by every part of speech,
+- an open addressing hash over the string table (crc32, linear probing),
+- the strings in byte order with an OR-tree of their feature masks and a
+  min-tree of the bytes each shares with the previous one, a flattened
+  prefix trie used for completions and fuzzy search (see trie.py),
+- for every part of speech: the table cells as string ids, the packed
+  morphological features of every column (see speech_parts.FEATURES) and
+  postings (string id -> cells containing it, in column order).
+
+The file is opened through mmap and every array is a view into the mapping,
+so opening does not depend on the lexicon size and the pages are shared
+between processes that open the same file.
+
+Rows added at the ends of the CSVs are merged into an already compiled
+lexicon instead of compiling it again (see refresh), which is how the
+default lexicon is reloaded while the parser runs (see lexicon.watch).
+
+Usage:
+    python -m polish_parser.binary_lexicon              # compile the bundled CSVs
+    python -m polish_parser.binary_lexicon out.bin      # compile into a custom path
+"""
+import csv
+import heapq
+import io
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from contextlib import ExitStack
+from typing import BinaryIO, Callable, TextIO
+
+import numpy as np
+
+module_dir = os.path.dirname(os.path.abspath(__file__))
+default_path = os.path.join(module_dir, "lexicon.bin")
+
+MAGIC = b"PLLX"
+VERSION = 4
+HEADER = struct.Struct("<4sIQ")  # magic, version, directory length
+ALIGNMENT = 8
+
+# part of speech -> source file, in the order the parser probes them
+SOURCES = {
+    "noun": "nouns.csv",
+    "verb": "verbs.csv",
+    "adjective": "adjectives.csv",
+    "pronoun": "pronouns.csv",
+}
+
+
+class StringTable:
+    """Read-only view over the strings of a compiled lexicon."""
+
+    def __init__(self, blob: memoryview, offsets: np.ndarray, slots: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+        self.slots = slots
+        # memoryviews give plain python ints, much faster than numpy scalars for single lookups
+        self._offsets = memoryview(offsets).cast("B").cast("q")
+        self._slots = memoryview(slots).cast("B").cast("i")
+        self._mask = len(slots) - 1
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, string_id: int) -> str:
+        return str(self.blob[self._offsets[string_id]:self._offsets[string_id + 1]], "utf-8")
+
+    def key(self, string_id: int) -> bytes:
+        """UTF-8 bytes of the string, the order of the sorted string ids."""
+        return bytes(self.blob[self._offsets[string_id]:self._offsets[string_id + 1]])
+
+    def find(self, word: str) -> int:
+        """Returns the id of the string or -1 if it's not in the table."""
+        # lone surrogates (e.g. from JSON) pass as bytes no stored string has, so they aren't found
+        key = word.encode("utf-8", "surrogatepass")
+        slot = zlib.crc32(key) & self._mask
+        while True:
+            string_id = self._slots[slot]
+            if string_id < 0:
+                return -1
+            if self.blob[self._offsets[string_id]:self._offsets[string_id + 1]] == key:
+                return string_id
+            slot = (slot + 1) & self._mask
+
+
+class PartTable:
+    """Read-only view over one part of speech of a compiled lexicon."""
+
+    def __init__(self, name: str, columns: list[str], features: np.ndarray, cells: np.ndarray,
+                 postings_offsets: np.ndarray, postings: np.ndarray):
+        self.name = name
+        self.columns = columns
+        self.column_index = {c: i for i, c in enumerate(columns)}
+        self.features = features  # packed features of every column, shared by all forms in it
+        self.cells = cells  # (rows, columns) string ids, -1 for an empty cell
+        self.postings_offsets = postings_offsets
+        self.postings = postings  # row-major cell indices
+        self._postings_offsets = memoryview(postings_offsets).cast("B").cast("i")
+        self._postings = memoryview(postings).cast("B").cast("i")
+
+    @property
+    def n_rows(self) -> int:
+        return self.cells.shape[0]
+
+    @property
+    def n_columns(self) -> int:
+        return self.cells.shape[1]
+
+    def occurrences(self, string_id: int) -> memoryview:
+        """Cells (row * n_columns + column) holding the string, ordered by column then row."""
+        if string_id < 0:
+            return self._postings[0:0]
+        return self._postings[self._postings_offsets[string_id]:self._postings_offsets[string_id + 1]]
+
+    def column_ids_of(self, string_id: int) -> list[int]:
+        n_columns = self.n_columns
+        return list(dict.fromkeys(cell % n_columns for cell in self.occurrences(string_id)))
+
+    def rows_of(self, string_id: int) -> list[int]:
+        n_columns = self.n_columns
+        return sorted({cell // n_columns for cell in self.occurrences(string_id)})
+
+
+class LexiconFile:
+    """A compiled lexicon opened from a file (through mmap) or from an in-memory buffer."""
+
+    def __init__(self, buffer, meta: dict, sections: dict[str, tuple[str, int, int]]):
+        self.buffer = buffer
+        self.meta = meta
+        self.path: str | None = None  # of the mapped file, None for a buffer
+        view = memoryview(buffer)
+        self.arrays = {name: np.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+                       for name, (dtype, offset, count) in sections.items()}
+        arrays = self.arrays
+        blob_offset, blob_length = sections["strings.blob"][1], sections["strings.blob"][2]
+        self.strings = StringTable(view[blob_offset:blob_offset + blob_length],
+                                   arrays["strings.offsets"], arrays["strings.slots"])
+        self.sorted_ids = arrays["strings.sorted"]  # string ids in byte order
+        self.mask_tree = arrays["strings.mask_tree"]  # OR of the features of every range of sorted_ids
+        self.lcp_tree = arrays["strings.lcp_tree"]  # min of the common prefixes of every range of sorted_ids
+        self.parts: dict[str, PartTable] = dict()
+        for name, part in meta["parts"].items():
+            columns = part["columns"]
+            self.parts[name] = PartTable(name, columns,
+                                         arrays[f"{name}.features"],
+                                         arrays[f"{name}.cells"].reshape(part["rows"], len(columns)),
+                                         arrays[f"{name}.postings_offsets"],
+                                         arrays[f"{name}.postings"])
+
+    @classmethod
+    def from_buffer(cls, buffer) -> "LexiconFile":
+        magic, version, directory_length = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a compiled lexicon file.")
+        if version != VERSION:
+            raise ValueError(f"Unsupported lexicon file version: {version}. Expected: {VERSION}.")
+        directory = json.loads(bytes(buffer[HEADER.size:HEADER.size + directory_length]))
+        return cls(buffer, directory["meta"], {k: tuple(v) for k, v in directory["sections"].items()})
+
+    @classmethod
+    def open(cls, path: str) -> "LexiconFile":
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        lexicon_file = cls.from_buffer(mapped)
+        lexicon_file.path = os.path.abspath(path)
+        return lexicon_file
+
+    def part(self, name: str) -> PartTable:
+        return self.parts[name]
+
+    def is_stale(self, directory: str = module_dir) -> bool:
+        """Checks whether the CSVs the file was compiled from have changed since."""
+        return self.meta.get("sources") != source_stamps(directory)
+
+
+class LexiconWriter:
+    """Collects lexicon tables and serializes them into the compiled format."""
+
+    def __init__(self):
+        self.string_ids: dict[str, int] = dict()
+        self.strings: list[bytes] = list()
+        self.parts: dict[str, tuple[list[str], list[int], list[list[int]]]] = dict()
+        self.meta: dict = dict()
+
+    def intern(self, value: str) -> int:
+        string_id = self.string_ids.get(value)
+        if string_id is None:
+            string_id = self.string_ids[value] = len(self.strings)
+            self.strings.append(value.encode())
+        return string_id
+
+    def add_part(self, name: str, columns: list[str], features: list[int]):
+        self.parts[name] = (list(columns), list(features), list())
+
+    def add_row(self, name: str, values: list[str | None]):
+        columns, _, rows = self.parts[name]
+        # short rows are padded with empty cells, like pandas does
+        rows.append([self.intern(v) if v else -1 for v in values] + [-1] * (len(columns) - len(values)))
+
+    def to_bytes(self) -> bytes:
+        out = io.BytesIO()
+        self.write_to(out)
+        return out.getvalue()
+
+    def write_to(self, f: BinaryIO):
+        n_strings = len(self.strings)
+        lengths = np.fromiter((len(s) for s in self.strings), dtype=np.int64, count=n_strings)
+        offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        blob = np.frombuffer(b"".join(self.strings), dtype=np.uint8)
+        slots = build_slots(np.fromiter((zlib.crc32(s) for s in self.strings), dtype=np.int64, count=n_strings))
+        sorted_ids = np.array(sorted(range(n_strings), key=self.strings.__getitem__), dtype=np.int32)
+        parts = {name: (columns, np.array(features, dtype=np.uint32),
+                        np.array(rows, dtype=np.int32).reshape(len(rows), len(columns)))
+                 for name, (columns, features, rows) in self.parts.items()}
+        pack(f, build_arrays(blob, offsets, slots, sorted_ids, parts), dict(self.meta, parts=part_meta(parts)))
+
+    def write(self, path: str):
+        write_atomic(path, self.write_to)
+
+
+class SpillingLexiconWriter:
+    """
+    LexiconWriter for lexicons too large to hold as python objects. Rows are spilled to temporary files as
+    they come and the distinct strings are sorted externally, in runs of at most run_size strings merged at
+    the end. Only the sort is bounded by the run size: write_to builds the string table, the cells of every part,
+    the postings and the trees in memory at once, about twice the size of the file. Strings get ids in byte order.
+    """
+
+    def __init__(self, temp_dir: str | None = None, run_size: int = 1_000_000):
+        self.parts: dict[str, tuple[list[str], list[int]]] = dict()
+        self.meta: dict = dict()
+        self.run_size = run_size
+        self.n_rows: dict[str, int] = dict()
+        self._temp = tempfile.TemporaryDirectory(prefix="lexicon-", dir=temp_dir)
+        self._rows: dict[str, TextIO] = dict()
+        self._run: set[str] = set()
+        self._runs: list[str] = list()
+
+    def add_part(self, name: str, columns: list[str], features: list[int]):
+        self.parts[name] = (list(columns), list(features))
+        self._rows[name] = open(os.path.join(self._temp.name, f"{name}.rows"), "w", encoding="utf-8", newline="\n")
+        self.n_rows[name] = 0
+
+    def add_row(self, name: str, values: list[str | None]):
+        columns, _ = self.parts[name]
+        values = [v or "" for v in values] + [""] * (len(columns) - len(values))
+        self._rows[name].write("\t".join(values) + "\n")
+        self.n_rows[name] += 1
+        self._run.update(v for v in values if v)
+        if len(self._run) >= self.run_size:
+            self._spill_run()
+
+    def _spill_run(self):
+        path = os.path.join(self._temp.name, f"{len(self._runs)}.run")
+        with open(path, "w", encoding="utf-8", newline="\n") as f:
+            # code point order of str is the byte order of UTF-8
+            f.writelines(f"{s}\n" for s in sorted(self._run))
+        self._runs.append(path)
+        self._run = set()
+
+    def _merge_runs(self) -> tuple[bytearray, array, array]:
+        """Blob, offsets and crc32 hashes of the distinct strings in byte order."""
+        blob, offsets, hashes = bytearray(), array("q", [0]), array("I")
+        with ExitStack() as stack:
+            runs = [stack.enter_context(open(path, encoding="utf-8", newline="\n")) for path in self._runs]
+            previous = None
+            for line in heapq.merge(*runs):
+                if line == previous:
+                    continue
+                previous = line
+                key = line[:-1].encode()
+                blob += key
+                offsets.append(len(blob))
+                hashes.append(zlib.crc32(key))
+        return blob, offsets, hashes
+
+    def write_to(self, f: BinaryIO):
+        for rows in self._rows.values():
+            rows.close()
+        if self._run:
+            self._spill_run()
+        blob, offsets, hashes = self._merge_runs()
+        offsets = np.frombuffer(offsets, dtype=np.int64)
+        slots = build_slots(np.frombuffer(hashes, dtype=f"u{hashes.itemsize}"))
+        strings = StringTable(memoryview(blob), offsets, slots)
+
+        parts = dict()
+        for name, (columns, features) in self.parts.items():
+            cells = array("i")
+            with open(os.path.join(self._temp.name, f"{name}.rows"), encoding="utf-8", newline="\n") as rows:
+                for line in rows:
+                    cells.extend(strings.find(v) if v else -1 for v in line[:-1].split("\t"))
+            parts[name] = (columns, np.array(features, dtype=np.uint32),
+                           np.frombuffer(cells, dtype=np.int32).reshape(self.n_rows[name], len(columns)))
+        sorted_ids = np.arange(len(strings), dtype=np.int32)
+        pack(f, build_arrays(np.frombuffer(blob, dtype=np.uint8), offsets, slots, sorted_ids, parts),
+             dict(self.meta, parts=part_meta(parts)))
+
+    def write(self, path: str):
+        """Compiles the lexicon into the path, the writer can't be used afterwards."""
+        try:
+            write_atomic(path, self.write_to)
+        finally:
+            self.close()
+
+    def close(self):
+        for rows in self._rows.values():
+            rows.close()
+        self._temp.cleanup()
+
+
+def part_meta(parts: dict[str, tuple[list[str], np.ndarray, np.ndarray]]) -> dict:
+    return {name: {"columns": columns, "rows": len(cells)} for name, (columns, _, cells) in parts.items()}
+
+
+def build_arrays(blob: np.ndarray, offsets: np.ndarray, slots: np.ndarray, sorted_ids: np.ndarray,
+                 parts: dict[str, tuple[list[str], np.ndarray, np.ndarray]]) -> dict[str, np.ndarray]:
+    """Every section of the file from the string table and the (columns, features, cells) of every part."""
+    n_strings = len(offsets) - 1
+    arrays: dict[str, np.ndarray] = {"strings.offsets": offsets, "strings.blob": blob, "strings.slots": slots}
+    masks = np.zeros(n_strings, dtype=np.uint32)  # features of every column a string appears in, all parts
+    for name, (columns, features, cells) in parts.items():
+        arrays[f"{name}.features"] = features
+        arrays[f"{name}.cells"] = cells
+        arrays[f"{name}.postings_offsets"], arrays[f"{name}.postings"] = build_postings(cells, n_strings)
+        valid = cells >= 0
+        np.bitwise_or.at(masks, cells[valid], np.broadcast_to(features, cells.shape)[valid])
+    arrays["strings.sorted"] = sorted_ids
+    arrays["strings.mask_tree"] = build_mask_tree(masks[sorted_ids])
+    arrays["strings.lcp_tree"] = build_lcp_tree(blob, offsets, sorted_ids)
+    return arrays
+
+
+def pack(f: BinaryIO, arrays: dict[str, np.ndarray], meta: dict):
+    """Writes the header, the directory and the arrays, each aligned, into the file."""
+    # the directory holds offsets that depend on its own length, so lay it out until it's stable
+    directory_length = 0
+    while True:
+        offset = align(HEADER.size + directory_length)
+        sections = dict()
+        for name, array in arrays.items():
+            sections[name] = (array.dtype.str, offset, array.size)
+            offset = align(offset + array.nbytes)
+        directory = json.dumps({"meta": meta, "sections": sections}, ensure_ascii=False).encode()
+        if len(directory) <= directory_length:
+            break
+        directory_length = len(directory)
+
+    f.write(HEADER.pack(MAGIC, VERSION, directory_length))
+    f.write(directory + b" " * (directory_length - len(directory)))
+    position = HEADER.size + directory_length
+    for name, array in arrays.items():
+        _, start, _ = sections[name]
+        f.write(b"\0" * (start - position))
+        f.write(np.ascontiguousarray(array).reshape(-1).view(np.uint8).data)
+        position = start + array.nbytes
+    f.write(b"\0" * (offset - position))
+
+
+def write_atomic(path: str, write: Callable[[BinaryIO], None]):
+    # write next to the target and rename, so readers never map a half written file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def build_slots(hashes: np.ndarray) -> np.ndarray:
+    """Open addressing table over the strings with the given crc32 hashes."""
+    # power of two table at most half full, so probing sequences stay short
+    n_slots = 8
+    while n_slots < 2 * len(hashes):
+        n_slots *= 2
+    mask = n_slots - 1
+    slots = np.full(n_slots, -1, dtype=np.int32)
+    pending = np.arange(len(hashes), dtype=np.int32)
+    position = hashes.astype(np.int64) & mask
+    # linear probing, placing every string whose slot is free in each round
+    while pending.size:
+        free = slots[position] < 0
+        _, first = np.unique(position, return_index=True)
+        placed = np.zeros(pending.size, dtype=bool)
+        placed[first] = True
+        placed &= free
+        slots[position[placed]] = pending[placed]
+        pending, position = pending[~placed], (position[~placed] + 1) & mask
+    return slots
+
+
+def build_tree(leaves: np.ndarray, combine: np.ufunc) -> np.ndarray:
+    # implicit binary tree: node i has children 2i and 2i + 1, leaves start at the first power of two >= n,
+    # padding leaves are zero
+    n_leaves = 1
+    while n_leaves < len(leaves):
+        n_leaves *= 2
+    tree = np.zeros(2 * n_leaves, dtype=leaves.dtype)
+    tree[n_leaves:n_leaves + len(leaves)] = leaves
+    level = n_leaves
+    while level > 1:
+        tree[level // 2:level] = combine(tree[level:2 * level:2], tree[level + 1:2 * level:2])
+        level //= 2
+    return tree
+
+
+def build_mask_tree(leaves: np.ndarray) -> np.ndarray:
+    return build_tree(leaves.astype(np.uint32), np.bitwise_or)
+
+
+def build_lcp_tree(blob: np.ndarray, offsets: np.ndarray, sorted_ids: np.ndarray) -> np.ndarray:
+    # bytes every string shares with the previous one in byte order, capped at 255
+    starts = offsets[sorted_ids]
+    lengths = offsets[sorted_ids + 1] - starts
+    lcp = np.zeros(len(sorted_ids), dtype=np.uint8)
+    pending = np.arange(1, len(sorted_ids))
+    for i in range(255):
+        pending = pending[(lengths[pending] > i) & (lengths[pending - 1] > i)]
+        pending = pending[blob[starts[pending] + i] == blob[starts[pending - 1] + i]]
+        if not pending.size:
+            break
+        lcp[pending] += 1
+    return build_tree(lcp, np.minimum)
+
+
+def build_postings(cells: np.ndarray, n_strings: int) -> tuple[np.ndarray, np.ndarray]:
+    n_rows, n_columns = cells.shape
+    # column-major walk, so every posting list is ordered by column then row
+    column_major = cells.T.ravel()
+    positions = np.flatnonzero(column_major >= 0)
+    string_ids = column_major[positions]
+    order = np.argsort(string_ids, kind="stable")
+    rows, columns = positions[order] % max(n_rows, 1), positions[order] // max(n_rows, 1)
+    postings = (rows * n_columns + columns).astype(np.int32)
+    counts = np.bincount(string_ids, minlength=n_strings)
+    offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int32)
+    return offsets, postings
+
+
+def extend_arrays(lexicon_file: LexiconFile, rows: dict[str, list[list[str]]]) -> dict[str, np.ndarray]:
+    """
+    Sections of the lexicon with the rows added below the rows of their parts. The sections are updated
+    instead of being built again: new strings go to the end of the string table and are merged into the
+    byte order, only the postings, masks and common prefixes of the strings in the new rows change.
+    """
+    strings, arrays = lexicon_file.strings, lexicon_file.arrays
+    n_old = len(strings)
+    added: dict[str, int] = dict()
+
+    def intern(value: str) -> int:
+        string_id = strings.find(value)
+        if string_id < 0:
+            string_id = added.setdefault(value, n_old + len(added))
+        return string_id
+
+    new_cells = dict()
+    for name, part in lexicon_file.parts.items():
+        part_rows = rows.get(name, [])
+        new_cells[name] = np.array([[intern(v) if v else -1 for v in row] + [-1] * (part.n_columns - len(row))
+                                    for row in part_rows], dtype=np.int32).reshape(len(part_rows), part.n_columns)
+
+    new_strings = [value.encode() for value in added]
+    n_strings = n_old + len(new_strings)
+    lengths = np.fromiter(map(len, new_strings), dtype=np.int64, count=len(new_strings))
+    offsets = np.concatenate((strings.offsets, strings.offsets[-1] + np.cumsum(lengths))).astype(np.int64)
+    blob = np.concatenate((arrays["strings.blob"], np.frombuffer(b"".join(new_strings), dtype=np.uint8)))
+    result = dict(arrays)
+    result["strings.offsets"], result["strings.blob"] = offsets, blob
+    result["strings.slots"] = extend_slots(strings.slots, blob, offsets, n_old)
+
+    n_leaves = len(lexicon_file.mask_tree) // 2
+    masks = np.zeros(n_strings, dtype=np.uint32)
+    masks[lexicon_file.sorted_ids] = lexicon_file.mask_tree[n_leaves:n_leaves + n_old]
+    for name, cells in new_cells.items():
+        part = lexicon_file.part(name)
+        result[f"{name}.cells"] = np.concatenate((part.cells, cells))
+        result[f"{name}.postings_offsets"], result[f"{name}.postings"] = extend_postings(part, cells, n_strings)
+        valid = cells >= 0
+        np.bitwise_or.at(masks, cells[valid], np.broadcast_to(part.features, cells.shape)[valid])
+
+    # every new string goes before the first old one sorting after it, equal positions keep the new order
+    def key(string_id: int) -> bytes:
+        return strings.key(string_id) if string_id < n_old else new_strings[string_id - n_old]
+
+    old_sorted = memoryview(lexicon_file.sorted_ids).cast("B").cast("i")
+    new_sorted = sorted(range(n_old, n_strings), key=key)
+    positions = [bisect_left(old_sorted, key(string_id), key=strings.key) for string_id in new_sorted]
+    sorted_ids = np.insert(lexicon_file.sorted_ids, positions, new_sorted).astype(np.int32)
+    result["strings.sorted"] = sorted_ids
+    result["strings.mask_tree"] = build_mask_tree(masks[sorted_ids])
+
+    # only the new strings and the ones right after them have a different predecessor
+    lcp = np.insert(lexicon_file.lcp_tree[n_leaves:n_leaves + n_old], positions, 0)
+    inserted = np.asarray(positions, dtype=np.int64) + np.arange(len(positions))
+    for position in np.union1d(inserted, inserted + 1).tolist():
+        if 0 < position < n_strings:
+            shared = os.path.commonprefix((key(int(sorted_ids[position - 1])), key(int(sorted_ids[position]))))
+            lcp[position] = min(len(shared), 255)
+    result["strings.lcp_tree"] = build_tree(lcp, np.minimum)
+    return result
+
+
+def extend_slots(slots: np.ndarray, blob: np.ndarray, offsets: np.ndarray, n_old: int) -> np.ndarray:
+    """Hash table over the strings, the old table with the strings from n_old on added while it's at most half full."""
+    n_strings = len(offsets) - 1
+    if 2 * n_strings > len(slots):
+        return build_slots(np.fromiter((zlib.crc32(blob[offsets[i]:offsets[i + 1]]) for i in range(n_strings)),
+                                       dtype=np.int64, count=n_strings))
+    slots = slots.copy()
+    mask = len(slots) - 1
+    for string_id in range(n_old, n_strings):
+        slot = zlib.crc32(blob[offsets[string_id]:offsets[string_id + 1]]) & mask
+        while slots[slot] >= 0:
+            slot = (slot + 1) & mask
+        slots[slot] = string_id
+    return slots
+
+
+def extend_postings(part: PartTable, cells: np.ndarray, n_strings: int) -> tuple[np.ndarray, np.ndarray]:
+    """Postings of the part with the cells added below its rows, for a string table grown to n_strings."""
+    n_rows, n_columns = part.cells.shape
+    n_old = len(part.postings_offsets) - 1
+    offsets = np.concatenate((part.postings_offsets, np.full(n_strings - n_old, part.postings_offsets[-1])))
+    if not cells.size:
+        return offsets.astype(np.int32), part.postings
+    new_offsets, new_postings = build_postings(cells, n_strings)
+    new_postings += n_rows * n_columns
+    # postings are ordered by string, column, then row and the new rows come last, so every new posting
+    # goes after the old ones of its string and column, the postings of new strings go at the end
+    string_ids = np.searchsorted(new_offsets, np.arange(len(new_postings)), side="right") - 1
+    old_offsets, old_postings = part._postings_offsets, part._postings
+    positions = [bisect_right(old_postings, cell % n_columns, old_offsets[string_id], old_offsets[string_id + 1],
+                              key=lambda c: c % n_columns) if string_id < n_old else len(old_postings)
+                 for string_id, cell in zip(string_ids.tolist(), new_postings.tolist())]
+    postings = np.insert(part.postings, positions, new_postings)
+    return (offsets + new_offsets).astype(np.int32), postings.astype(np.int32)
+
+
+def source_stamps(directory: str = module_dir) -> dict[str, list[int]]:
+    stamps = dict()
+    for file in SOURCES.values():
+        stat = os.stat(os.path.join(directory, file))
+        stamps[file] = [stat.st_size, stat.st_mtime_ns]
+    return stamps
+
+
+def read_sources(directory: str = module_dir) -> dict[str, bytes]:
+    sources = dict()
+    for file in SOURCES.values():
+        with open(os.path.join(directory, file), "rb") as f:
+            sources[file] = f.read()
+    return sources
+
+
+def read_csv(path: str) -> tuple[list[str], list[list[str]]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        columns = next(reader)
+        return columns, [row for row in reader if row]
+
+
+def compile_csv(directory: str = module_dir) -> LexiconWriter:
+    from .speech_parts import WordType, column_features
+
+    writer = LexiconWriter()
+    for name, file in SOURCES.items():
+        columns, rows = read_csv(os.path.join(directory, file))
+        writer.add_part(name, columns, [column_features(c, WordType(name)) for c in columns])
+        for row in rows:
+            writer.add_row(name, row)
+    writer.meta["sources"] = source_stamps(directory)
+    writer.meta["checksums"] = {file: zlib.crc32(data) for file, data in read_sources(directory).items()}
+    return writer
+
+
+def load(path: str = default_path, directory: str = module_dir) -> LexiconFile:
+    """
+    Opens the compiled lexicon, compiling it first if it's missing, in an older format or older than the CSVs.
+    If the compiled file cannot be written it's kept in memory instead.
+    """
+    if os.path.exists(path):
+        try:
+            lexicon_file = LexiconFile.open(path)
+            if not lexicon_file.is_stale(directory):
+                return lexicon_file
+        except ValueError:
+            pass
+    return write_and_open(path, compile_csv(directory).write_to)
+
+
+def refresh(lexicon_file: LexiconFile, path: str = default_path, directory: str = module_dir) -> LexiconFile:
+    """
+    The lexicon of the current CSVs: the given one if they haven't changed since it was compiled, the given
+    one extended with the new rows if rows were only added at the ends of the CSVs, compiled anew otherwise.
+    The result is written to the path, a lexicon opened from the old file keeps its mapping.
+    """
+    if not lexicon_file.is_stale(directory):
+        return lexicon_file
+    stamps, sources = source_stamps(directory), read_sources(directory)
+    rows = appended_rows(lexicon_file, sources)
+    if rows is None:
+        return write_and_open(path, compile_csv(directory).write_to)
+    arrays = extend_arrays(lexicon_file, rows)
+    # the old checksums are those of the unchanged heads, carry them on over the tails
+    checksums = {file: zlib.crc32(memoryview(data)[lexicon_file.meta["sources"][file][0]:],
+                                  lexicon_file.meta["checksums"][file]) for file, data in sources.items()}
+    meta = dict(lexicon_file.meta, sources=stamps, checksums=checksums)
+    meta["parts"] = {name: {"columns": part["columns"], "rows": part["rows"] + len(rows[name])}
+                     for name, part in lexicon_file.meta["parts"].items()}
+    return write_and_open(path, lambda f: pack(f, arrays, meta))
+
+
+def appended_rows(lexicon_file: LexiconFile, sources: dict[str, bytes]) -> dict[str, list[list[str]]] | None:
+    """
+    Rows added at the ends of the CSVs since the lexicon was compiled from them, None if the CSVs were
+    changed in any other way or the lexicon doesn't record what it was compiled from.
+    """
+    stamps, checksums = lexicon_file.meta.get("sources"), lexicon_file.meta.get("checksums")
+    if not stamps or not checksums:
+        return None
+    rows = dict()
+    for name, file in SOURCES.items():
+        data, size = sources[file], stamps[file][0]
+        if len(data) < size or zlib.crc32(memoryview(data)[:size]) != checksums[file]:
+            return None
+        tail = data[size:]
+        # a tail not starting a line of its own would continue the last row
+        if tail and size and data[size - 1:size] != b"\n" and not tail.startswith((b"\n", b"\r\n")):
+            return None
+        rows[name] = [row for row in csv.reader(io.StringIO(tail.decode("utf-8"), newline="")) if row]
+    return rows
+
+
+def write_and_open(path: str, write: Callable[[BinaryIO], None]) -> LexiconFile:
+    """Writes the lexicon to the path and opens it, if the file cannot be written it's kept in memory instead."""
+    try:
+        write_atomic(path, write)
+        return LexiconFile.open(path)
+    except OSError:
+        out = io.BytesIO()
+        write(out)
+        return LexiconFile.from_buffer(out.getvalue())
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else default_path
+    compile_csv().write(target)
+    compiled = LexiconFile.open(target)
+    print(f"Compiled {len(compiled.strings)} strings "
+          f"({', '.join(f'{p.n_rows} {n}s' for n, p in compiled.parts.items())}) into {target}")
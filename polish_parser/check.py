@@ -0,0 +1,130 @@
+"""
+Grammar checking of text files.
+
+Streams a file of any size, which may be compressed with gzip, bz2 or xz, through the parser in
+batches of lines and writes a JSON line for every problem:
+
+    {"row": 12, "position": 6, "length": 5, "reason": "Unrecognized word", "suggestions": ["psa", "psem"]}
+
+Rows count from 0 and every problem of a line is reported, the parser recovers after each one
+(see Parser.parse_all), with its best few suggestions (see suggestions.py). Only a batch is in
+memory at a time, whatever the size of the file. Bytes which aren't UTF-8 are read as U+FFFD.
+The lines per second are reported on stderr.
+
+Usage:
+    python -m polish_parser.check corpus.txt.gz [-o problems.jsonl] [--lexicon lexicon.bin]
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import sys
+import time
+from itertools import islice
+from typing import Iterable, Iterator, NamedTuple, TextIO
+
+from .lexicon import Lexicon
+from .parser import Parser, ResultMultiple
+from .suggestions import SUGGESTIONS
+
+
+class CheckStats(NamedTuple):
+    lines: int
+    problems: int
+    seconds: float
+    peak_rss: int | None  # bytes, None where the platform doesn't report it
+
+    @property
+    def lines_per_second(self) -> float:
+        return self.lines / self.seconds if self.seconds else 0.0
+
+
+def check_lines(lines: Iterable[str], parser: Parser | None = None, batch_size: int = 10_000
+                ) -> Iterator[ResultMultiple]:
+    """
+    Problems of the lines in their order, like Parser.parse_multiple_all on them joined. The lines are parsed with
+    Parser.parse_many_all in batches, only one of which is held at a time.
+    """
+    parser = parser or Parser()
+    lines = iter(lines)
+    row = 0
+    while batch := list(islice(lines, batch_size)):
+        for i, results in enumerate(parser.parse_many_all(batch)):
+            for result in results:
+                yield ResultMultiple(row + i, result.position, result.length, result.expected, result.reason)
+        row += len(batch)
+
+
+def problem(result: ResultMultiple) -> dict:
+    """The JSON object of a problem, see the module documentation."""
+    return {"row": result.row, "position": result.position, "length": result.length, "reason": result.reason,
+            "suggestions": [w.word for w in result.expected]}
+
+
+def diagnostic(result: ResultMultiple) -> str:
+    return json.dumps(problem(result), ensure_ascii=False)
+
+
+def check_file(path: str, out: TextIO, parser: Parser | None = None, batch_size: int = 10_000,
+               progress: TextIO | None = sys.stderr) -> CheckStats:
+    """Writes a diagnostic line for every problem of the file ('-' for stdin) to out, reporting progress on stderr."""
+    from .importer import open_dump, peak_rss
+
+    start = time.perf_counter()
+    n_lines = problems = 0
+
+    def counted(file: TextIO) -> Iterator[str]:
+        nonlocal n_lines
+        for line in file:
+            n_lines += 1
+            if progress is not None and n_lines % 1_000_000 == 0:
+                print(f"{n_lines} lines, {n_lines / (time.perf_counter() - start):.0f} lines/s", file=progress)
+            yield line
+
+    # a corpus has some bad bytes, they are read as U+FFFD, an unrecognized word, instead of ending the check
+    if path == "-":
+        file = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", errors="replace", newline="\n")
+    else:
+        file = open_dump(path, errors="replace")
+    try:
+        for result in check_lines(counted(file), parser, batch_size):
+            out.write(diagnostic(result) + "\n")
+            problems += 1
+    finally:
+        if path == "-":
+            file.detach()  # stdin is left open
+        else:
+            file.close()
+    return CheckStats(n_lines, problems, time.perf_counter() - start, peak_rss())
+
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arguments.add_argument("file", help="text file, may be .gz, .bz2 or .xz, '-' for stdin")
+    arguments.add_argument("-o", "--out", help="JSON lines of the problems, stdout by default")
+    arguments.add_argument("--lexicon", help="compiled lexicon to check against, e.g. one made by the importer")
+    arguments.add_argument("--batch-size", type=int, default=10_000, help="lines parsed at once")
+    arguments.add_argument("--suggestions", type=int, default=SUGGESTIONS, help="most suggestions of a problem")
+    args = arguments.parse_args()
+
+    lexicon = None
+    if args.lexicon is not None:
+        from .binary_lexicon import LexiconFile
+        lexicon = Lexicon.from_file(LexiconFile.open(args.lexicon))
+    parser = Parser(lexicon, args.suggestions)
+    out = open(args.out, "w", encoding="utf-8") if args.out else io.TextIOWrapper(sys.stdout.buffer, "utf-8")
+    try:
+        stats = check_file(args.file, out, parser, args.batch_size)
+    finally:
+        if args.out:
+            out.close()
+        else:
+            out.detach()  # flushed, stdout is left open
+    peak = f"{stats.peak_rss / 2 ** 20:.0f} MB" if stats.peak_rss is not None else "unknown"
+    print(f"Checked {stats.lines} lines, {stats.problems} problems in {stats.seconds:.1f} s, "
+          f"{stats.lines_per_second:.0f} lines/s, peak RSS {peak}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
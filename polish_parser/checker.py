@@ -0,0 +1,98 @@
+"""
+Checking large texts on several cores.
+
+DocumentChecker splits a text into chunks of lines and checks them like Parser.parse_multiple in
+a pool of processes. The lexicon is published once (see lexicon.publish_lexicon) and every worker
+maps it when it starts, so the workers neither compile nor copy it. The result has the row of the
+whole text, the chunks are merged in their order.
+
+    with DocumentChecker(workers=4, chunk_size=1000) as checker:
+        result = checker.check(text)
+"""
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+
+from .lexicon import Lexicon, attach_lexicon, get_lexicon, publish_lexicon
+from .parser import Parser, ResultMultiple
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+_parser: Parser | None = None  # of a worker process
+
+
+def _start_worker(path: str):
+    global _parser
+    _parser = Parser(attach_lexicon(path))
+
+
+def _check_chunk(row: int, lines: list[str]) -> ResultMultiple | None:
+    """First error of the lines, the first of them being the row of the text."""
+    for i, result in enumerate(_parser.parse_many(lines)):
+        if result:
+            return ResultMultiple(row + i, result.position, result.length, result.expected, result.reason)
+    return None
+
+
+class DocumentChecker:
+    """
+    A pool of worker processes checking texts like Parser.parse_multiple. The workers start with the first check
+    and are kept until close(), a reload of the default lexicon starts new ones. A path of a compiled lexicon
+    (e.g. one made by the importer) is checked against instead of the default one.
+    """
+
+    def __init__(self, workers: int | None = None, chunk_size: int = 1000, path: str | None = None):
+        if chunk_size < 1:
+            raise ValueError(f"Chunk size must be positive, got {chunk_size}.")
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.path = path
+        self._pool: ProcessPoolExecutor | None = None
+        self._lexicon: Lexicon | None = None  # default lexicon the workers attached to
+
+    def __enter__(self) -> DocumentChecker:
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def check(self, text: str) -> ResultMultiple | None:
+        """The first error of the text, what Parser.parse_multiple would return for it."""
+        lines = text.split("\n")
+        for i in range(len(lines) - 1):
+            lines[i] += "\n"
+
+        pool = self._get_pool()
+        futures = [pool.submit(_check_chunk, row, lines[row:row + self.chunk_size])
+                   for row in range(0, len(lines), self.chunk_size)]
+        try:
+            for future in futures:
+                result = future.result()
+                if result:
+                    return result
+            return None
+        finally:
+            # chunks after the first error aren't needed
+            for future in futures:
+                future.cancel()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        lexicon = get_lexicon() if self.path is None else None
+        if self._pool is None or lexicon is not self._lexicon:
+            # imported here, they take longer to import than the rest of the package
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            self.close()
+            # spawned, a forked worker could inherit a lock held by a thread of this process, e.g. the watcher's
+            self._pool = ProcessPoolExecutor(self.workers, multiprocessing.get_context("spawn"), _start_worker,
+                                             (self.path or publish_lexicon(),))
+            self._lexicon = lexicon
+        return self._pool
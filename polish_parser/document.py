@@ -0,0 +1,139 @@
+"""
+Incremental checking of a text while it's being typed.
+
+A Document holds a text checked like Parser.parse_multiple: every line is a sentence of its own
+and the result is the first line with an error. It keeps the words of every line, their analyses
+and the parse result, so an edit (offset, deleted length, inserted text) only splits and parses
+again the lines it touches, looking up only the words that aren't in them already. The other lines
+keep their results however long the text is, and the first error comes from a sorted list of the
+lines with one.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+
+from .lexicon import Lexicon
+from .parser import Parser, Result, ResultMultiple
+from .speech_parts import Word
+
+
+class Line:
+    """A line of a document with the analyses of its words and its parse result."""
+    text: str
+    words: list[str]
+    analyses: list[tuple[Word, ...]]
+    finished: bool  # whether its last word is complete, the last line's isn't until a space follows it
+    result: Result | None
+
+    def __init__(self, text: str, words: list[str], analyses: list[tuple[Word, ...]], finished: bool,
+                 result: Result | None):
+        self.text = text
+        self.words = words
+        self.analyses = analyses
+        self.finished = finished
+        self.result = result
+
+
+class Document:
+    def __init__(self, text: str = "", parser: Parser | None = None):
+        self.parser = parser or Parser()
+        self._lexicon: Lexicon = self.parser.lexicon
+        self._lines = [self._parse_line("", False, dict())]
+        self._starts = [0]  # offsets of the first lines, extended when needed
+        self._length = 0
+        self._errors: list[int] = list()  # lines whose result is an error, ascending
+        if text:
+            self.edit(0, 0, text)
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def text(self) -> str:
+        return "\n".join(line.text for line in self._lines)
+
+    @property
+    def lines(self) -> list[Line]:
+        return list(self._lines)
+
+    def result(self) -> ResultMultiple | None:
+        """The first error of the text, what Parser.parse_multiple would return for it."""
+        if not self._errors:
+            return None
+        row = self._errors[0]
+        result = self._lines[row].result
+        return ResultMultiple(row, result.position, result.length, result.expected, result.reason)
+
+    def edit(self, offset: int, deleted: int, inserted: str) -> ResultMultiple | None:
+        """Replaces `deleted` characters from the offset with the inserted text and returns the new result."""
+        if offset < 0 or deleted < 0 or offset + deleted > self._length:
+            raise ValueError(f"Edit out of the text: offset {offset}, deleted {deleted}, length {self._length}.")
+        first, column = self._locate(offset)
+        last, end_column = self._locate(offset + deleted)
+        text = self._lines[first].text[:column] + inserted + self._lines[last].text[end_column:]
+        self._replace(first, last + 1, text.split("\n"))
+        self._length += len(inserted) - deleted
+        return self.result()
+
+    def set_text(self, text: str) -> ResultMultiple | None:
+        """
+        Replaces the whole text, for editors which only give the new text (e.g. Streamlit). The lines are compared
+        with the old ones and only the changed ones are parsed again.
+        """
+        texts = text.split("\n")
+        lines = self._lines
+        common = min(len(texts), len(lines))
+        start = 0
+        while start < common and texts[start] == lines[start].text:
+            start += 1
+        end = 0
+        while end < common - start and texts[-1 - end] == lines[-1 - end].text:
+            end += 1
+        if start < len(texts) - end or start < len(lines) - end:
+            self._replace(start, len(lines) - end, texts[start:len(texts) - end])
+        self._length = len(text)
+        return self.result()
+
+    def _locate(self, offset: int) -> tuple[int, int]:
+        """Line and column of the offset."""
+        starts, lines = self._starts, self._lines
+        while len(starts) < len(lines) and starts[-1] <= offset:
+            starts.append(starts[-1] + len(lines[len(starts) - 1].text) + 1)
+        line = bisect_right(starts, offset) - 1
+        return line, offset - starts[line]
+
+    def _replace(self, start: int, stop: int, texts: list[str]):
+        """Puts lines with the texts in place of the lines from start to stop."""
+        lines = self._lines
+        lexicon = self.parser.lexicon
+        if lexicon is not self._lexicon:
+            # the lexicon was reloaded, no analysis holds anymore
+            self._lexicon = lexicon
+            texts = [line.text for line in lines[:start]] + texts + [line.text for line in lines[stop:]]
+            start, stop = 0, len(lines)
+            known = dict()
+        else:
+            if stop == len(lines) and start > 0 and (start == stop or not texts):
+                # the line before becomes or stops being the last one, whether its last word is finished may change
+                start -= 1
+                texts = [lines[start].text] + texts
+            known = {word: a for line in lines[start:stop] for word, a in zip(line.words, line.analyses)}
+        n_lines = len(lines) - (stop - start) + len(texts)
+        new = [self._parse_line(text, start + i < n_lines - 1, known) for i, text in enumerate(texts)]
+        lines[start:stop] = new
+        del self._starts[start + 1:]
+
+        errors = self._errors
+        shift = len(texts) - (stop - start)
+        errors[bisect_left(errors, start):] = ([start + i for i, line in enumerate(new) if line.result]
+                                               + [row + shift for row in errors[bisect_left(errors, stop):]])
+
+    def _parse_line(self, text: str, finished: bool, known: dict[str, tuple[Word, ...]]) -> Line:
+        # the last line isn't followed by a newline, its last word is finished by a space only
+        finished = finished or text.endswith(" ")
+        words = text.split()
+        analyses = [known[word] if word in known else self.parser.analyze(word, self._lexicon) for word in words]
+        result = None
+        if words:
+            result = self.parser.parse_analyzed(words, analyses if finished else analyses[:-1] + [()], self._lexicon)
+        return Line(text, words, analyses, finished, result)
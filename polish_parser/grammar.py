@@ -0,0 +1,305 @@
+"""
+The sentence grammar, declared as data for the parser to run.
+
+A sentence is a sequence of constituents, SENTENCE, any of which may be cut short by the end of
+the sentence. A constituent is an LL(1) automaton over the types of its words (None for a word
+the lexicon doesn't know): its rules[state][type] is the rule for the next word. A rule either
+rejects the word, or checks it, updates the features agreed on in the constituent and goes on to
+its next state, None ending the constituent.
+
+Checks compare feature masks (see speech_parts.FEATURES): the features of the word, or of all its
+analyses of the rule's type, have to share a bit of the checked field with the required ones, which
+are the case of the constituent, the features agreed on so far and/or fixed values. Adding a
+constituent means adding its rules here, the parser runs all of them the same way.
+
+Reasons are formatted with the word (its first analysis), case (of the constituent) and genders and
+numbers (values agreed on so far). Suggestions are functions of the parse state giving candidates
+with their edit distance from the word, which the parser ranks when the diagnostic is read (see
+suggestions.py). They may only depend on the word, its first analysis, the case and the values
+agreed on, the parses of a batch share their results.
+"""
+from __future__ import annotations
+
+from typing import Callable, Iterable, Iterator, NamedTuple, TYPE_CHECKING
+
+from .speech_parts import FEATURE_BITS, Conjugation, Number, Person, Word, WordType, feature_mask
+from .suggestions import edit_distance
+
+if TYPE_CHECKING:
+    from .parser import ParseState
+
+Suggest = Callable[["ParseState"], Iterable[tuple[int, Word]]]  # (edit distance, word) candidates
+
+GOVERNED = "governed"  # the case of a constituent is the one governed by the word before it
+
+
+class Check(NamedTuple):
+    field: str  # "number", "conjugation", "gender" or "person"
+    reason: str
+    suggest: Suggest | None = None
+    of_word: bool = False  # the word's own features, otherwise those of its analyses of the rule's type
+    case: bool = False  # the case of the constituent is required
+    agreed: bool = False  # one of the values agreed on so far is required
+    values: tuple = ()  # values required besides
+
+
+class Reject(NamedTuple):
+    reason: str
+    suggest: Suggest | None = None
+
+
+class Rule(NamedTuple):
+    checks: tuple[Check, ...] = ()
+    reject: Reject | None = None
+    analyses: WordType | None = None  # analyses checked and agreed on, of the word's type by default
+    agree: str | None = None  # "start" agreeing on the features of the analyses, "narrow" them down, or keep them
+    then: int | None = None
+
+
+class Constituent(NamedTuple):
+    name: str
+    case: Conjugation | str | None  # fixed, GOVERNED or none
+    agree_anew: bool  # start without agreed features, otherwise keep those of the constituent before
+    rules: tuple[dict[WordType | None, Rule], ...]
+
+
+class CompiledCheck(NamedTuple):
+    field: int  # mask of the field
+    of_word: bool
+    case: bool
+    agreed: bool
+    values: int
+    check: Check
+
+
+class CompiledRule(NamedTuple):
+    checks: tuple[CompiledCheck, ...]
+    reject: Reject | None
+    analyses: int  # type bit of the analyses, 0 for the word's own type
+    agree: str | None
+    then: int | None
+
+
+class CompiledConstituent(NamedTuple):
+    name: str
+    case: Conjugation | str | None
+    agree_anew: bool
+    rules: tuple[dict[int, CompiledRule], ...]  # by the type bit of the word, 0 for an unknown word
+
+
+def field_bits(field: str) -> int:
+    return feature_mask(field, list(FEATURE_BITS[field]))
+
+
+TYPE_BITS = field_bits("type")
+AGREEMENT_BITS = field_bits("gender") | field_bits("number") | field_bits("conjugation")
+TYPES_BY_BIT = {bit: type for type, bit in FEATURE_BITS["type"].items() if type is not None}
+
+
+def type_bit(type: WordType | None) -> int:
+    return 0 if type is None else FEATURE_BITS["type"][type]
+
+
+class ReasonFields(dict):
+    """Fields of the reasons, each made only when a reason uses it."""
+
+    def __init__(self, state: ParseState):
+        super().__init__()
+        self.state = state
+
+    def __missing__(self, key: str):
+        if key == "word":
+            return self.state.category
+        if key == "case":
+            return self.state.case
+        if key == "genders":
+            return [p.value for p in self.state.previous_genders]
+        if key == "numbers":
+            return [p.value for p in self.state.previous_numbers]
+        raise KeyError(key)
+
+
+def compile_grammar(sentence: tuple[Constituent, ...]) -> tuple[CompiledConstituent, ...]:
+    """Turns the rules into tables of masks looked up by the type bits of the words."""
+    compiled = list()
+    for constituent in sentence:
+        states = list()
+        for rules in constituent.rules:
+            if set(rules) != {None, *WordType}:
+                raise ValueError(f"{constituent.name} has no rule for {set(WordType) - set(rules)} in a state.")
+            states.append({type_bit(type): CompiledRule(
+                tuple(CompiledCheck(field_bits(c.field), c.of_word, c.case, c.agreed,
+                                    feature_mask(c.field, list(c.values)), c) for c in rule.checks),
+                rule.reject, type_bit(rule.analyses), rule.agree, rule.then) for type, rule in rules.items()})
+        compiled.append(CompiledConstituent(constituent.name, constituent.case, constituent.agree_anew, tuple(states)))
+    return tuple(compiled)
+
+
+# suggestions
+
+def complete(*types: WordType, agreed: bool = False) -> Suggest:
+    """Completions of the word in the constituent's case."""
+    def suggest(state: ParseState) -> Iterator[tuple[int, Word]]:
+        if agreed:
+            found = state.lexicon.iter_complete(state.word, list(types), conjugation=state.case,
+                                                gender=state.previous_genders, number=state.previous_numbers)
+        else:
+            found = state.lexicon.iter_complete(state.word, list(types), conjugation=state.case)
+        return ((len(w.word) - len(state.word), w) for w in found)
+    return suggest
+
+
+def form(type: WordType, agreed: bool = False) -> Suggest:
+    """Forms of the word in the constituent's case, of its own gender and number or of those agreed on."""
+    def suggest(state: ParseState) -> Iterator[tuple[int, Word]]:
+        word = state.category
+        if agreed:
+            found = state.lexicon.part(type).get(word=word.word, conjugation=state.case,
+                                                 gender=state.previous_genders, number=state.previous_numbers)
+        else:
+            found = state.lexicon.part(type).get(word=word.word, conjugation=state.case, gender=word.gender,
+                                                 number=word.number)
+        return ((edit_distance(state.word, w.word), w) for w in found)
+    return suggest
+
+
+def verb_form(base: bool = False) -> Suggest:
+    """Forms of the verb, found by its base form when it isn't conjugated, agreeing with the subject."""
+    def suggest(state: ParseState) -> Iterator[tuple[int, Word]]:
+        key = "base" if base else "word"
+        found = state.lexicon.verbs.get(**{key: state.category.word}, gender=state.previous_genders,
+                                        number=state.previous_numbers, person=Person.THIRD)
+        return ((edit_distance(state.word, w.word), w) for w in found)
+    return suggest
+
+
+def similar_verb(state: ParseState) -> Iterator[tuple[int, Word]]:
+    """Verbs close to the unknown word, then its completions, agreeing with the subject."""
+    features = dict(gender=state.previous_genders + [None], number=state.previous_numbers, person=Person.THIRD)
+    # few words are that close, the completions may be many
+    similar = list(state.lexicon.iter_similar(state.word, [WordType.VERB], 2, **features))
+    seen = {w.word for _, w in similar}
+    yield from similar
+    for w in state.lexicon.iter_complete(state.word, [WordType.VERB], **features):
+        if w.word not in seen:
+            yield len(w.word) - len(state.word), w
+
+
+# the grammar
+
+NOUN, VERB, ADJECTIVE, PRONOUN = WordType.NOUN, WordType.VERB, WordType.ADJECTIVE, WordType.PRONOUN
+UNRECOGNIZED = "Unrecognized word"
+TWO_ADJECTIVES = Reject("Two adjectives are not allowed.")
+
+
+def agreement(subject: str, type: WordType, case_reason: str) -> tuple[Check, ...]:
+    """Checks of a word after the first one of a noun phrase: its case, then agreement with the words before."""
+    return (Check("conjugation", case_reason, form(type, agreed=True), case=True),
+            Check("gender", f"{subject} should match the gender of the previous word: {{genders}}. "
+                            f"But is in {{word.gender.value}}.", form(ADJECTIVE, agreed=True), agreed=True),
+            Check("number", f"{subject} should match the number of the previous word: {{numbers}}. "
+                            f"But is in {{word.number.value}}.", form(ADJECTIVE, agreed=True), agreed=True))
+
+
+SUBJECT = Constituent("subject", Conjugation.NOM, True, (
+    {  # first word
+        None: Rule(reject=Reject(UNRECOGNIZED, complete(NOUN, ADJECTIVE, PRONOUN))),
+        VERB: Rule(reject=Reject("First word should be a noun, adjective or pronoun not a verb.")),
+        NOUN: Rule((Check("conjugation", "Subject should be in nominative form. But is in {word.conjugation.value}.",
+                          form(NOUN), case=True),), agree="start"),
+        ADJECTIVE: Rule((Check("conjugation", "Subject's adjective should be in nominative form. "
+                                              "But is in {word.conjugation.value}.", form(ADJECTIVE), case=True),),
+                        agree="start", then=1),
+        PRONOUN: Rule((Check("conjugation", "Subject's pronoun should be in nominative form. "
+                                            "But is in {word.conjugation.value}.", form(PRONOUN), case=True),),
+                      agree="start", then=2),
+    },
+    {  # after an adjective
+        None: Rule(reject=Reject(UNRECOGNIZED, complete(NOUN, ADJECTIVE, agreed=True))),
+        VERB: Rule(reject=Reject("Second word should be a noun or adjective not a verb.")),
+        NOUN: Rule(agreement("Subject", NOUN, "Subject should be in nominative form. "
+                                              "But is in {word.conjugation.value}."), agree="narrow"),
+        ADJECTIVE: Rule(reject=TWO_ADJECTIVES),
+        PRONOUN: Rule(reject=Reject("Subject's pronoun should always be first.")),
+    },
+    {  # after a pronoun
+        None: Rule(reject=Reject(UNRECOGNIZED, complete(NOUN, ADJECTIVE, agreed=True))),
+        VERB: Rule(reject=Reject("Second word should be a noun or adjective not a verb.")),
+        NOUN: Rule(agreement("Subject", NOUN, "Subject should be in nominative form. "
+                                              "But is in {word.conjugation.value}."), agree="narrow"),
+        ADJECTIVE: Rule(agreement("Subject's adjective", ADJECTIVE, "Subject's adjective should be in nominative form. "
+                                                                    "But is in {word.conjugation.value}."),
+                        agree="narrow", then=3),
+        PRONOUN: Rule(reject=Reject("Subject's pronoun should always be first.")),
+    },
+    {  # third word, after a pronoun and an adjective
+        None: Rule(reject=Reject(UNRECOGNIZED, complete(NOUN, agreed=True))),
+        VERB: Rule(reject=Reject("Third word should be a noun not a verb.")),
+        NOUN: Rule(agreement("Subject", NOUN, "Subject should be in nominative form. "
+                                              "But is in {word.conjugation.value}.")),
+        ADJECTIVE: Rule(reject=TWO_ADJECTIVES),
+        PRONOUN: Rule(reject=Reject("Subject's pronoun should always be first.")),
+    },
+))
+
+VERB_PHRASE = Constituent("verb", None, False, (
+    {
+        None: Rule(reject=Reject(UNRECOGNIZED, similar_verb)),
+        VERB: Rule((Check("number", "Verb should match the noun number: {numbers}. But is the verb is not conjugated.",
+                          verb_form(base=True), of_word=True, values=(Number.SG, Number.PL)),
+                    Check("number", "Verb should match the noun number: {numbers}. But is {word.number.value}.",
+                          verb_form(), of_word=True, agreed=True),
+                    Check("gender", "Verb gender should match the noun gender: {genders}. But is {word.gender.value}.",
+                          verb_form(), of_word=True, agreed=True, values=(None,)),
+                    Check("person", "Verb should be in 3rd person. But is {word.person.value}.",
+                          verb_form(), of_word=True, values=(Person.THIRD,)))),
+        NOUN: Rule(reject=Reject("Subject should be followed be a verb not a noun.")),
+        ADJECTIVE: Rule(reject=Reject("Subject should be followed be a verb not an adjective.")),
+        PRONOUN: Rule(reject=Reject("Subject should be followed be a verb not a pronoun.")),
+    },
+))
+
+OBJECT = Constituent("object", GOVERNED, True, (
+    {  # first word
+        None: Rule(reject=Reject(UNRECOGNIZED, complete(NOUN, ADJECTIVE, PRONOUN))),
+        VERB: Rule(reject=Reject("Verb should be followed by a noun, adjective or pronoun not a verb.")),
+        NOUN: Rule((Check("conjugation", "Object should be in {case.value} form. But is in {word.conjugation.value}.",
+                          form(NOUN), case=True),), agree="start"),
+        ADJECTIVE: Rule((Check("conjugation", "Object's adjective should be in {case.value} form. "
+                                              "But is in {word.conjugation.value}.", form(ADJECTIVE), case=True),),
+                        agree="start", then=1),
+        # checked and agreed on as an adjective
+        PRONOUN: Rule((Check("conjugation", "Object's pronoun should be in {case.value} form. "
+                                            "But is in {word.conjugation.value}.", form(PRONOUN), case=True),),
+                      analyses=ADJECTIVE, agree="start", then=2),
+    },
+    {  # after an adjective
+        None: Rule(reject=Reject(UNRECOGNIZED, complete(NOUN, ADJECTIVE, agreed=True))),
+        VERB: Rule(reject=Reject("There is only one verb allowed per sentence.")),
+        NOUN: Rule(agreement("Object", NOUN, "Object should be in {case} form. But is in {word.conjugation.value}."),
+                   agree="narrow"),
+        ADJECTIVE: Rule(reject=TWO_ADJECTIVES),
+        PRONOUN: Rule(reject=Reject("Object's pronoun should always be first after the verb.")),
+    },
+    {  # after a pronoun
+        None: Rule(reject=Reject(UNRECOGNIZED, complete(NOUN, ADJECTIVE, agreed=True))),
+        VERB: Rule(reject=Reject("There is only one verb allowed per sentence.")),
+        NOUN: Rule(agreement("Object", NOUN, "Object should be in {case} form. But is in {word.conjugation.value}."),
+                   agree="narrow"),
+        ADJECTIVE: Rule(agreement("Object's adjective", ADJECTIVE, "Object's adjective should be in nominative form. "
+                                                                   "But is in {word.conjugation.value}."),
+                        agree="narrow", then=3),
+        PRONOUN: Rule(reject=Reject("Object's pronoun should always be first after the verb.")),
+    },
+    {  # third word, after a pronoun and an adjective
+        None: Rule(reject=Reject(UNRECOGNIZED, complete(NOUN, agreed=True))),
+        VERB: Rule(reject=Reject("There is only one verb allowed per sentence.")),
+        NOUN: Rule(agreement("Object", NOUN, "Object should be in nominative form. "
+                                             "But is in {word.conjugation.value}.")),
+        ADJECTIVE: Rule(reject=TWO_ADJECTIVES),
+        PRONOUN: Rule(reject=Reject("Subject's pronoun should always be first after a verb.")),
+    },
+))
+
+SENTENCE = (SUBJECT, VERB_PHRASE, OBJECT)
+COMPILED_SENTENCE = compile_grammar(SENTENCE)
@@ -0,0 +1,252 @@
+"""
+Streaming importer for large morphological dictionaries.
+
+Reads SGJP/PoliMorf style tab separated dumps, one form per line:
+
+    form<TAB>lemma<TAB>tag[<TAB>anything else]
+    psa	pies:Sm2	subst:sg:gen.acc:m2	nazwa_pospolita
+
+Tags follow the NKJP tagset, '.' separates alternative values and '|' alternative tags.
+They are mapped onto the columns of the bundled lexicon (see speech_parts.Word.from_str):
+
+- subst -> nouns, one row per lemma holding the block of its gender,
+- adj in the positive degree -> adjectives, or pronouns for the possessive pronouns
+  of the bundled pronouns.csv, which the tagset files under adj,
+- inf, fin and praet -> verbs; the past tense of the 1st and 2nd person and the
+  conditional are written with the agglutinates and 'by' in the dumps, so they are
+  built from the praet forms (the agl variant, e.g. 'niosł', where there is one),
+
+other tags are skipped, and a dump none of whose lines has a known tag is an error.
+Lines of one lemma are expected to be next to each other, like in the published dumps,
+and every run of them becomes a row. Only that row is kept in memory while the dump is
+read, the rest goes through SpillingLexiconWriter, which sorts the forms in runs of
+--run-size. The compiled arrays are built in memory at the end though, so the peak
+grows with the lexicon: about twice the size of the output file. Dumps may be
+compressed with gzip, bz2 or xz, their lines may end with LF or CRLF.
+
+The imported lexicon is not tied to the bundled CSVs, open it with
+Lexicon.from_file(LexiconFile.open(path)) and pass it to Parser.
+
+Usage:
+    python -m polish_parser.importer polimorf.tab.gz polimorf.bin [--run-size 1000000]
+"""
+from __future__ import annotations
+
+import argparse
+import bz2
+import gzip
+import itertools
+import lzma
+import os
+import sys
+import time
+from typing import Iterator, NamedTuple, TextIO
+
+from .binary_lexicon import SOURCES, SpillingLexiconWriter, module_dir, read_csv
+from .speech_parts import Conjugation, Gender, Number, Person, WordType, column_features
+
+NUMBERS = {"sg": Number.SG, "pl": Number.PL}
+CASES = {"nom": Conjugation.NOM, "gen": Conjugation.GEN, "dat": Conjugation.DAT, "acc": Conjugation.ACC,
+         "inst": Conjugation.INS, "loc": Conjugation.LOC, "voc": Conjugation.VOC}
+# pluralia tantum (p1, p2, p3) have no gender of their own, they are declined in the plural only
+GENDERS = {"m1": Gender.M, "m2": Gender.M, "m3": Gender.M, "f": Gender.F,
+           "n": Gender.N, "n1": Gender.N, "n2": Gender.N, "p1": Gender.M, "p2": Gender.N, "p3": Gender.N}
+# when several tags give a form for one column, the first of these wins, e.g. 'dobrego' over 'dobry' in SG_ACC_M
+GENDER_PRIORITY = {"m1": 0, "m2": 1, "m3": 2}
+PERSONS = {"pri": Person.FIRST, "sec": Person.SECOND, "ter": Person.THIRD}
+
+# endings of the past tense (agglutinates) and of the conditional, by number, gender and person
+PAST_ENDINGS = {("SG", "M"): {1: "em", 2: "eś"}, ("SG", "F"): {1: "m", 2: "ś"},
+                ("PL", "M"): {1: "śmy", 2: "ście"}, ("PL", "F"): {1: "śmy", 2: "ście"}}
+CONDITIONAL_ENDINGS = {1: {"SG": "bym", "PL": "byśmy"}, 2: {"SG": "byś", "PL": "byście"}, 3: {"SG": "by", "PL": "by"}}
+
+
+class ImportStats(NamedTuple):
+    lines: int
+    skipped: int  # lines whose tag has no column
+    rows: dict[str, int]
+    seconds: float
+    peak_rss: int | None  # bytes, None where the platform doesn't report it
+
+    @property
+    def lines_per_second(self) -> float:
+        return self.lines / self.seconds if self.seconds else 0.0
+
+
+def open_dump(path: str, errors: str = "strict") -> TextIO:
+    opener = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}.get(os.path.splitext(path)[1], open)
+    return opener(path, "rt", encoding="utf-8", errors=errors, newline="\n")
+
+
+def peak_rss() -> int | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def expand(tag: str) -> Iterator[list[str]]:
+    """Every combination of the alternatives in the tag, e.g. 'subst:sg:nom.acc:m3' -> sg:nom:m3, sg:acc:m3."""
+    if "." not in tag and "|" not in tag:
+        yield tag.split(":")
+        return
+    for alternative in tag.split("|"):
+        for values in itertools.product(*(field.split(".") for field in alternative.split(":"))):
+            yield list(values)
+
+
+class Paradigm:
+    """Forms of one lemma by column, for every part of speech it has forms in."""
+
+    def __init__(self, columns: dict[str, list[str]], pronoun_lemmas: set[str]):
+        self.columns = columns
+        self.pronoun_lemmas = pronoun_lemmas
+        self.lemma = ""
+        self.forms: dict[str, dict[str, tuple[int, str]]] = {name: dict() for name in columns}
+        self.past: dict[tuple[str, str], tuple[int, str]] = dict()  # (number, gender) -> praet form
+        self.agglutinating: dict[tuple[str, str], str] = dict()  # (number, gender) -> agl variant
+
+    def add(self, form: str, tag: str) -> bool:
+        """Adds the form under every column its tag maps to, returns False if there is none."""
+        added = False
+        for fields in expand(tag):
+            added |= self.add_fields(form, fields)
+        return added
+
+    def put(self, part: str, column: str, form: str, priority: int = 0):
+        forms = self.forms[part]
+        if column not in forms or priority < forms[column][0]:
+            forms[column] = (priority, form)
+
+    def add_fields(self, form: str, fields: list[str]) -> bool:
+        kind = fields[0]
+        if kind == "subst" and len(fields) >= 4 and fields[1] in NUMBERS and fields[2] in CASES \
+                and fields[3] in GENDERS:
+            number, case, gender = NUMBERS[fields[1]], CASES[fields[2]], GENDERS[fields[3]]
+            self.put("noun", f"{number.name}_{case.name}_{gender.name}", form, GENDER_PRIORITY.get(fields[3], 0))
+            return True
+        if kind == "adj" and len(fields) >= 4 and fields[1] in NUMBERS and fields[2] in CASES \
+                and fields[3] in GENDERS and (len(fields) < 5 or fields[4] == "pos"):
+            number, case = NUMBERS[fields[1]], CASES[fields[2]]
+            # the masculine plural columns hold the virile (m1) forms, the others are the non-virile ones
+            if number == Number.PL and fields[3] in ("m2", "m3"):
+                return True
+            gender = GENDERS[fields[3]]
+            part = "pronoun" if self.lemma in self.pronoun_lemmas else "adjective"
+            self.put(part, f"{number.name}_{case.name}_{gender.name}", form, GENDER_PRIORITY.get(fields[3], 0))
+            return True
+        if kind == "inf":
+            self.put("verb", "VERB", form)
+            return True
+        if kind == "fin" and len(fields) >= 3 and fields[1] in NUMBERS and fields[2] in PERSONS:
+            number, person = NUMBERS[fields[1]], Person.to_number(PERSONS[fields[2]])
+            self.put("verb", f"{number.name}_GEN_-_{person}_PRES_IND", form)
+            return True
+        if kind == "praet" and len(fields) >= 3 and fields[1] in NUMBERS and fields[2] in GENDERS:
+            number = NUMBERS[fields[1]].name
+            if number == "SG":
+                gender = GENDERS[fields[2]].name
+            else:
+                gender = "M" if fields[2] == "m1" else "F"
+            key, priority = (number, gender), GENDER_PRIORITY.get(fields[2], 0)
+            if "agl" in fields[3:]:
+                self.agglutinating.setdefault(key, form)
+            elif key not in self.past or priority < self.past[key][0]:
+                self.past[key] = (priority, form)
+            return True
+        return False
+
+    def conjugate_past(self):
+        """Past tense and conditional columns from the praet forms."""
+        past = {key: form for key, (_, form) in self.past.items()}
+        for (number, gender), form in past.items():
+            self.put("verb", f"{number}_GEN_{gender}_3_PAST_IND", form)
+            self.put("verb", f"{number}_GEN_{gender}_3_-_PRE", attach(form, CONDITIONAL_ENDINGS[3][number]))
+            if (number, gender) in PAST_ENDINGS:
+                stem = self.agglutinating.get((number, gender), form)
+                for person, ending in PAST_ENDINGS[number, gender].items():
+                    self.put("verb", f"{number}_GEN_{gender}_{person}_PAST_IND", attach(stem, ending))
+                    self.put("verb", f"{number}_GEN_{gender}_{person}_-_PRE",
+                             attach(form, CONDITIONAL_ENDINGS[person][number]))
+
+    def rows(self) -> Iterator[tuple[str, list[str]]]:
+        self.conjugate_past()
+        for part, forms in self.forms.items():
+            if forms:
+                yield part, [forms[c][1] if c in forms else "" for c in self.columns[part]]
+
+
+def attach(form: str, ending: str) -> str:
+    """Ending after the verb itself, also in forms like 'śmiał się'."""
+    head, space, rest = form.partition(" ")
+    return head + ending + space + rest
+
+
+def pronoun_lemmas(directory: str = module_dir) -> set[str]:
+    columns, rows = read_csv(os.path.join(directory, SOURCES["pronoun"]))
+    lemma = columns.index("SG_NOM_M")
+    return {row[lemma].strip() for row in rows}
+
+
+def import_dump(path: str, out_path: str, run_size: int = 1_000_000, progress: TextIO | None = sys.stderr,
+                pronouns: set[str] | None = None) -> ImportStats:
+    """Compiles the dump into a lexicon file at out_path, reporting progress every million lines."""
+    pronouns = pronoun_lemmas() if pronouns is None else pronouns
+    columns = {name: read_csv(os.path.join(module_dir, file))[0] for name, file in SOURCES.items()}
+    writer = SpillingLexiconWriter(temp_dir=os.path.dirname(os.path.abspath(out_path)), run_size=run_size)
+    for name, part_columns in columns.items():
+        writer.add_part(name, part_columns, [column_features(c, WordType(name)) for c in part_columns])
+
+    start = time.perf_counter()
+    lines = skipped = 0
+    paradigm, key = None, None
+    try:
+        with open_dump(path) as dump:
+            for line in dump:
+                fields = line.rstrip("\r\n").split("\t")
+                if len(fields) < 3 or line.startswith("#"):
+                    continue
+                lines += 1
+                form, lemma, tag = fields[:3]
+                if lemma != key:
+                    if paradigm is not None:
+                        for part, row in paradigm.rows():
+                            writer.add_row(part, row)
+                    paradigm, key = Paradigm(columns, pronouns), lemma
+                    # homonyms are told apart by a suffix, e.g. 'zamek:Sm3'
+                    paradigm.lemma = lemma.split(":")[0]
+                if not paradigm.add(form, tag):
+                    skipped += 1
+                if progress is not None and lines % 1_000_000 == 0:
+                    print(f"{lines} lines, {lines / (time.perf_counter() - start):.0f} lines/s", file=progress)
+        if paradigm is not None:
+            for part, row in paradigm.rows():
+                writer.add_row(part, row)
+        if skipped == lines:
+            raise ValueError(f"None of the {lines} lines of {path} has a known tag, is it a tab separated "
+                             f"form, lemma, tag dump?")
+        writer.meta["source"] = os.path.basename(path)
+        writer.write(out_path)
+    finally:
+        writer.close()
+    return ImportStats(lines, skipped, dict(writer.n_rows), time.perf_counter() - start, peak_rss())
+
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arguments.add_argument("dump")
+    arguments.add_argument("out")
+    arguments.add_argument("--run-size", type=int, default=1_000_000, help="distinct forms sorted in memory at once, only the sort is bounded by it")
+    args = arguments.parse_args()
+
+    stats = import_dump(args.dump, args.out, args.run_size)
+    peak = f"{stats.peak_rss / 2 ** 20:.0f} MB" if stats.peak_rss is not None else "unknown"
+    print(f"Imported {stats.lines} lines ({stats.skipped} skipped) into "
+          f"{', '.join(f'{n} {name}s' for name, n in stats.rows.items())} in {stats.seconds:.1f} s, "
+          f"{stats.lines_per_second:.0f} lines/s, peak RSS {peak}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import os
+from itertools import chain
+from threading import Event, Lock, Thread
+from typing import TYPE_CHECKING, Iterator
+
+from .cache import CacheInfo
+from .speech_parts import (Nouns, Verbs, Adjectives, Pronouns, Word, WordType, feature_masks, get_lexicon_file,
+                           matches, replace_lexicon_file)
+from .trie import FormTrie
+
+if TYPE_CHECKING:
+    from .binary_lexicon import LexiconFile, StringTable
+
+_lexicon: Lexicon | None = None
+_lexicon_lock = Lock()
+_reload_lock = Lock()
+_watcher: LexiconWatcher | None = None
+
+
+class Lexicon:
+    """All parts of speech behind one lookup."""
+    strings: StringTable
+    nouns: Nouns
+    verbs: Verbs
+    adjectives: Adjectives
+    pronouns: Pronouns
+    trie: FormTrie
+
+    @classmethod
+    def from_file(cls, lexicon_file: LexiconFile | None = None):
+        lexicon_file = lexicon_file or get_lexicon_file()
+        instance = cls()
+        instance.strings = lexicon_file.strings
+        instance.nouns = Nouns.from_file(lexicon_file)
+        instance.verbs = Verbs.from_file(lexicon_file)
+        instance.adjectives = Adjectives.from_file(lexicon_file)
+        instance.pronouns = Pronouns.from_file(lexicon_file)
+        instance.trie = FormTrie(lexicon_file.strings, lexicon_file.sorted_ids, lexicon_file.mask_tree,
+                                 lexicon_file.lcp_tree)
+        return instance
+
+    def part(self, type: WordType) -> Nouns | Verbs | Adjectives | Pronouns:
+        return {WordType.NOUN: self.nouns, WordType.VERB: self.verbs,
+                WordType.ADJECTIVE: self.adjectives, WordType.PRONOUN: self.pronouns}[type]
+
+    def analyze(self, word: str) -> tuple[Word, ...]:
+        """
+        Every analysis of the word, one per matching column, in the order nouns, verbs, adjectives, pronouns.
+        The first analysis is what Parser.categorize reports.
+        """
+        string_id = self.strings.find(word)
+        if string_id < 0:
+            return ()
+        return tuple(chain(self.nouns.pool.analyses(string_id), self.verbs.pool.analyses(string_id),
+                           self.adjectives.pool.analyses(string_id), self.pronouns.pool.analyses(string_id)))
+
+    def lemmas(self, word: str) -> tuple[Word, ...]:
+        """Lemmas of every paradigm holding the word, in the order nouns, verbs, adjectives, pronouns."""
+        string_id = self.strings.find(word)
+        if string_id < 0:
+            return ()
+        return tuple(chain(self.nouns.lemma_index.lemmas(string_id), self.verbs.lemma_index.lemmas(string_id),
+                           self.adjectives.lemma_index.lemmas(string_id), self.pronouns.lemma_index.lemmas(string_id)))
+
+    def paradigm(self, lemma: str, types: list[WordType] | None = None) -> list[Word]:
+        """Every form of the lemma in the given parts of speech (all by default), e.g. paradigm("słuchać")."""
+        string_id = self.strings.find(lemma)
+        if string_id < 0:
+            return []
+        return list(chain.from_iterable(self.part(t).lemma_index.paradigm(string_id) for t in types or WordType))
+
+    def complete(self, prefix: str, types: list[WordType], **possibilities) -> list[Word]:
+        """
+        Words of the given parts of speech starting with the prefix and matching the features,
+        e.g. complete("do", [WordType.ADJECTIVE], conjugation=Conjugation.NOM, gender=[Gender.M]).
+        One word per form and part of speech, grouped by part in the order of types, then in byte order.
+        """
+        found: list[list[Word]] = [list() for _ in types]
+        for i, word in self._complete(prefix, types, possibilities):
+            found[i].append(word)
+        return list(chain.from_iterable(found))
+
+    def iter_complete(self, prefix: str, types: list[WordType], **possibilities) -> Iterator[Word]:
+        """The words of complete() one at a time in byte order, found as they are read."""
+        return (word for _, word in self._complete(prefix, types, possibilities))
+
+    def _complete(self, prefix: str, types: list[WordType], possibilities: dict) -> Iterator[tuple[int, Word]]:
+        masks = feature_masks(type=types, **possibilities)
+        pools = [self.part(t).pool for t in types]
+        for string_id in self.trie.search(prefix, masks):
+            for i, pool in enumerate(pools):
+                for column in pool.table.column_ids_of(string_id):
+                    if matches(pool.codes[column], masks):
+                        yield i, pool.get(string_id, column)
+                        break
+
+    def similar(self, word: str, types: list[WordType], distance: int = 2, **possibilities) -> list[Word]:
+        """
+        Words of the given parts of speech within the edit distance from the word and matching the features.
+        One word per form and part of speech, closest first, then grouped by part in the order of types.
+        """
+        found = sorted(self._similar(word, types, distance, possibilities), key=lambda f: f[:2])
+        return [w for _, _, w in found]
+
+    def iter_similar(self, word: str, types: list[WordType], distance: int = 2,
+                     **possibilities) -> Iterator[tuple[int, Word]]:
+        """The words of similar() with their edit distance, one at a time in byte order, found as they are read."""
+        return ((d, w) for d, _, w in self._similar(word, types, distance, possibilities))
+
+    def _similar(self, word: str, types: list[WordType], distance: int,
+                 possibilities: dict) -> Iterator[tuple[int, int, Word]]:
+        masks = feature_masks(type=types, **possibilities)
+        pools = [self.part(t).pool for t in types]
+        for string_id, d in self.trie.fuzzy(word, distance, masks):
+            for i, pool in enumerate(pools):
+                for column in pool.table.column_ids_of(string_id):
+                    if matches(pool.codes[column], masks):
+                        yield d, i, pool.get(string_id, column)
+                        break
+
+    def cache_info(self) -> dict[str, CacheInfo]:
+        """get() cache statistics of every part of speech."""
+        return {"noun": self.nouns.cache.info(), "verb": self.verbs.cache.info(),
+                "adjective": self.adjectives.cache.info(), "pronoun": self.pronouns.cache.info()}
+
+
+def get_lexicon() -> Lexicon:
+    """Get or load the default lexicon. The first call opens the compiled file, later calls are free."""
+    global _lexicon
+    with _lexicon_lock:
+        if _lexicon is None:
+            _lexicon = Lexicon.from_file()
+    return _lexicon
+
+
+def warm_up(background: bool = True) -> Thread | None:
+    """
+    Loads the default lexicon ahead of the first parse. In the background by default,
+    a parse started before it finishes waits for the same load instead of starting another one.
+    """
+    if _lexicon is not None:
+        return None
+    if not background:
+        get_lexicon()
+        return None
+    thread = Thread(target=get_lexicon, name="polish-parser-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def publish_lexicon(path: str | None = None) -> str:
+    """
+    Returns the path of a compiled file holding the default lexicon, for worker processes to attach to:
+    ProcessPoolExecutor(initializer=attach_lexicon, initargs=(publish_lexicon(),)). The workers map the same
+    file, so the lexicon is in memory once whatever their number, and none of them reads the CSVs.
+    That's the compiled file of the package when the lexicon was opened from it, otherwise (e.g. a read-only
+    installation) the lexicon is written to the path, by default a file in shared memory removed at exit.
+    """
+    import atexit
+    import tempfile
+
+    from .binary_lexicon import write_atomic
+
+    lexicon_file = get_lexicon_file()
+    if path is None and lexicon_file.path is not None:
+        return lexicon_file.path
+    temporary = path is None
+    if temporary:
+        directory = "/dev/shm" if os.access("/dev/shm", os.W_OK) else tempfile.gettempdir()
+        path = os.path.join(directory, f"polish-parser-lexicon-{os.getpid()}.bin")
+        # published again by this process, it's already removed at exit
+        temporary = not os.path.exists(path)
+    write_atomic(path, lambda f: f.write(memoryview(lexicon_file.buffer)))
+    if temporary:
+        atexit.register(os.remove, path)
+    return path
+
+
+def attach_lexicon(path: str) -> Lexicon:
+    """
+    Makes the lexicon published at the path (see publish_lexicon) the default one of this process. The file is
+    mapped read-only as it is, the CSVs aren't checked or compiled, so a worker starts in a few milliseconds.
+    """
+    global _lexicon
+    from .binary_lexicon import LexiconFile
+
+    lexicon_file = LexiconFile.open(path)
+    lexicon = Lexicon.from_file(lexicon_file)
+    with _lexicon_lock:
+        replace_lexicon_file(lexicon_file)
+        _lexicon = lexicon
+    return lexicon
+
+
+def reload_lexicon(path: str | None = None, directory: str | None = None) -> bool:
+    """
+    Swaps in a default lexicon of the current CSVs if they changed since it was loaded, returns whether it did.
+    Rows added at the ends of the CSVs are added to the loaded lexicon, other changes compile it again
+    (see binary_lexicon.refresh). Parses already running finish with the lexicon they started with.
+    """
+    global _lexicon
+    from .binary_lexicon import default_path, module_dir, refresh
+
+    # one rebuild at a time, readers never wait for it, only for the swap
+    with _reload_lock:
+        current = get_lexicon_file()
+        updated = refresh(current, path or default_path, directory or module_dir)
+        if updated is current:
+            return False
+        lexicon = Lexicon.from_file(updated)
+        with _lexicon_lock:
+            replace_lexicon_file(updated)
+            _lexicon = lexicon
+    return True
+
+
+class LexiconWatcher:
+    """
+    Polls the CSVs of the default lexicon in a background thread and reloads it when they change.
+    A poll only compares the sizes and modification times of the files.
+    """
+
+    def __init__(self, interval: float = 1.0, path: str | None = None, directory: str | None = None):
+        self.interval = interval
+        self.path = path
+        self.directory = directory
+        self.reloads = 0
+        self.error: Exception | None = None  # of the last failed reload, e.g. a CSV saved half way
+        self._stopped = Event()
+        self._thread: Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> LexiconWatcher:
+        if not self.running:
+            self._stopped.clear()
+            self._thread = Thread(target=self._run, name="polish-parser-lexicon-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                if reload_lexicon(self.path, self.directory):
+                    self.reloads += 1
+                self.error = None
+            except Exception as error:
+                # keep serving the last good lexicon and try again at the next poll
+                self.error = error
+
+
+def watch(interval: float = 1.0) -> LexiconWatcher:
+    """Starts watching the CSVs of the default lexicon, once per process however many times it's called."""
+    global _watcher
+    with _lexicon_lock:
+        if _watcher is None:
+            _watcher = LexiconWatcher(interval)
+        return _watcher.start()
@@ -1,16 +1,27 @@
-from itertools import chain
+from functools import partial
+from threading import Lock
+from typing import Iterable, Iterator, Sequence
 
-from .speech_parts import Nouns, Verbs, Word, Conjugation, WordType, Person, Adjectives, Pronouns
-import Levenshtein
+from .cache import CacheInfo, LRUCache
+
+from .grammar import (AGREEMENT_BITS, COMPILED_SENTENCE, GOVERNED, TYPE_BITS, TYPES_BY_BIT, CompiledConstituent,
+                      ReasonFields, Suggest)
+from .lexicon import Lexicon, get_lexicon
+from .speech_parts import (FEATURE_BITS, Word, Conjugation, Gender, Number, WordType, Nouns, Verbs, Adjectives,
+                           Pronouns)
+from .suggestions import SUGGESTIONS, Suggestions, rank, shortlist
+
+# analyses of distinct tokens kept by a parser, most words of a text are a few frequent ones
+TOKEN_CACHE_SIZE = 100_000
 
 class ResultMultiple:
     row: int
     position: int
     length: int
-    expected: list[Word]
+    expected: Sequence[Word]
     reason: str
 
-    def __init__(self, row: int, position: int, length: int, expected: list[Word], reason: str):
+    def __init__(self, row: int, position: int, length: int, expected: Sequence[Word], reason: str):
         self.row = row
         self.position = position
         self.length = length
@@ -31,10 +42,10 @@ class ResultMultiple:
 class Result:
     position: int
     length: int
-    expected: list[Word]
+    expected: Sequence[Word]
     reason: str
 
-    def __init__(self, position: int, length: int, expected: list[Word], reason: str):
+    def __init__(self, position: int, length: int, expected: Sequence[Word], reason: str):
         self.position = position
         self.length = length
         self.expected = expected
@@ -50,437 +61,364 @@ class Result:
         return self.__str__()
 
 
-class Parser:
-    nouns = Nouns.from_file()
-    verbs = Verbs.from_file()
-    pronouns = Pronouns.from_file()
-    adjectives = Adjectives.from_file()
-    index: int = 0
-    position: int = 0
-    categorized_words: list[Word | None] = list()
-    words: list[str] = list()
-
-    previous_genders: list = list()
-    previous_numbers: list = list()
-    previous_conjugations: list = list()
-
-    def parse_subject(self) -> Result | None:
-        self.previous_genders = list()
-        self.previous_numbers = list()
-        self.previous_conjugations = list()
-        # first word
-        category = self.categorized_words[self.index]
-        word = self.words[self.index]
-        length = len(word)
-        possible = None
-        if category is None:  # suggest new words
-            return Result(self.position, length,
-                          [w for w in chain(self.nouns.get(conjugation=Conjugation.NOM),
-                                            self.adjectives.get(conjugation=Conjugation.NOM),
-                                            self.pronouns.get(conjugation=Conjugation.NOM)) if w.word.startswith(word)],
-                          "Unrecognized word")
-        elif category.type == WordType.VERB:
-            return Result(self.position, length, [], "First word should be a noun, adjective or pronoun not a verb.")
-        elif category.type == WordType.NOUN:
-            possible = self.nouns.get_all(category.word)
-            if Conjugation.NOM not in [p.conjugation for p in possible]:
-                return Result(self.position, length,
-                              self.nouns.get(word=category.word, conjugation=Conjugation.NOM, gender=category.gender,
-                                             number=category.number),
-                              f"Subject should be in nominative form. But is in {category.conjugation.value}.")
-        elif category.type == WordType.ADJECTIVE:
-            possible = self.adjectives.get_all(category.word)
-            if Conjugation.NOM not in [p.conjugation for p in possible]:
-                return Result(self.position, length,
-                              self.adjectives.get(word=category.word, conjugation=Conjugation.NOM, gender=category.gender,
-                                                  number=category.number),
-                              f"Subject's adjective should be in nominative form. But is in {category.conjugation.value}.")
-        elif category.type == WordType.PRONOUN:
-            possible = self.pronouns.get_all(category.word)
-            if Conjugation.NOM not in [p.conjugation for p in possible]:
-                return Result(self.position, length,
-                              self.pronouns.get(word=category.word, conjugation=Conjugation.NOM, gender=category.gender,
-                                                number=category.number),
-                              f"Subject's pronoun should be in nominative form. But is in {category.conjugation.value}.")
-        else:
-            raise ValueError("Something unexpected happened.")
-
-        # second word
+class ParseState:
+    """Everything one parse works on, so a Parser can run parses in several threads at once."""
+    lexicon: Lexicon
+    words: list[str]
+    analyses: list[tuple[Word, ...]]
+    categorized_words: list[Word | None]
+    index: int
+    position: int
+    before: dict[int, int]  # index of the word parsed before a word, where a word skipped is between them
+
+    case: Conjugation | None  # of the constituent being parsed
+    features: int  # agreed on in the constituent so far, as feature bits (see grammar.py)
+    agreed: list[tuple[int, int]]  # index and type bit of the analyses of every word agreed on, in order
+    then: int  # rules of the constituent the parse was rejected in
+
+    NO_SKIPS: dict[int, int] = dict()  # before of the parses which skip no word
+
+    def __init__(self, lexicon: Lexicon, words: list[str], analyses: list[tuple[Word, ...]],
+                 suggestions: dict | None = None):
+        # the lexicon stays the same for the whole parse, a reload in the middle of it only shows in later ones
+        self.lexicon = lexicon
+        self.words = words
+        self.analyses = analyses
+        self.suggestions = suggestions  # ranked suggestions shared by the parses of a batch, see Parser.suggest
+        self.categorized_words = [a[0] if a else None for a in analyses]
+        self.index = 0
+        self.position = 0
+        self.before = self.NO_SKIPS
+        self.case = None
+        self.features = 0
+        self.agreed = list()
+
+    @property
+    def word(self) -> str:
+        return self.words[self.index]
+
+    @property
+    def category(self) -> Word | None:
+        return self.categorized_words[self.index]
+
+    @property
+    def last(self) -> int:
+        """Index of the word parsed before the word of the state, -1 before the first one."""
+        return self.before.get(self.index, self.index - 1)
+
+    def skip(self):
+        """Leaves the word of the state out, the next word is parsed as if it followed the one before."""
+        if self.before is self.NO_SKIPS:
+            self.before = dict()
+        self.before[self.index + 1] = self.last
+        self.position += len(self.word) + 1
         self.index += 1
-        self.position += length + 1
-        self.previous_genders = list({p.gender for p in possible})
-        self.previous_numbers = list({p.number for p in possible})
-        self.previous_conjugations = list({p.conjugation for p in possible})
-        if self.index == len(self.categorized_words) or category.type == WordType.NOUN:
-            return None
-        previous = category
-        possible = None
-        category = self.categorized_words[self.index]
-        word = self.words[self.index]
-        length = len(word)
-
-        if category is None:  # suggest new words
-            return Result(self.position, length,
-                          [w for w in chain(self.nouns.get(conjugation=Conjugation.NOM, gender=self.previous_genders, number=self.previous_numbers),
-                                            self.adjectives.get(conjugation=Conjugation.NOM, gender=self.previous_genders, number=self.previous_numbers)) if w.word.startswith(word)],
-                          "Unrecognized word")
-        elif category.type == WordType.VERB:
-            return Result(self.position, length, [], "Second word should be a noun or adjective not a verb.")
-        elif category.type == WordType.NOUN:
-            possible = self.nouns.get_all(category.word)
-            if Conjugation.NOM not in [p.conjugation for p in possible]:
-                return Result(self.position, length,
-                              self.nouns.get(word=category.word, conjugation=Conjugation.NOM, gender=self.previous_genders,
-                                             number=self.previous_numbers),
-                              f"Subject should be in nominative form. But is in {category.conjugation.value}.")
-            elif not [p.gender for p in possible if p.gender in self.previous_genders]:
-                return Result(self.position, length,
-                              self.adjectives.get(word=category.word, conjugation=Conjugation.NOM,
-                                                  gender=self.previous_genders,
-                                                  number=self.previous_numbers),
-                              f"Subject should match the gender of the previous word: {[p.value for p in self.previous_genders]}. But is in {category.gender.value}.")
-            elif not [p.number for p in possible if p.number in self.previous_numbers]:
-                return Result(self.position, length,
-                              self.adjectives.get(word=category.word, conjugation=Conjugation.NOM,
-                                                  gender=self.previous_genders,
-                                                  number=self.previous_numbers),
-                              f"Subject should match the number of the previous word: {[p.value for p in self.previous_numbers]}. But is in {category.number.value}.")
-        elif category.type == WordType.ADJECTIVE:
-            possible = self.adjectives.get_all(category.word)
-            if previous.type == WordType.ADJECTIVE:
-                return Result(self.position, length,[], "Two adjectives are not allowed.")
-            elif Conjugation.NOM not in [p.conjugation for p in possible]:
-                return Result(self.position, length,
-                              self.adjectives.get(word=category.word, conjugation=Conjugation.NOM, gender=self.previous_genders,
-                                                  number=self.previous_numbers),
-                              f"Subject's adjective should be in nominative form. But is in {category.conjugation.value}.")
-            elif not [p.gender for p in possible if p.gender in self.previous_genders]:
-                return Result(self.position, length,
-                              self.adjectives.get(word=category.word, conjugation=Conjugation.NOM,
-                                                  gender=self.previous_genders,
-                                                  number=self.previous_numbers),
-                              f"Subject's adjective should match the gender of the previous word: {[p.value for p in self.previous_genders]}. But is in {category.gender.value}.")
-            elif not [p.number for p in possible if p.number in self.previous_numbers]:
-                return Result(self.position, length,
-                              self.adjectives.get(word=category.word, conjugation=Conjugation.NOM,
-                                                  gender=self.previous_genders,
-                                                  number=self.previous_numbers),
-                              f"Subject's adjective should match the number of the previous word: {[p.value for p in self.previous_numbers]}. But is in {category.number.value}.")
-        elif category.type == WordType.PRONOUN:
-            return Result(self.position, length, [], f"Subject's pronoun should always be first.")
-        else:
-            raise ValueError("Something unexpected happened.")
 
-        # third word
-        self.index += 1
-        self.position += length + 1
-        self.previous_genders = list({p.gender for p in possible}.intersection(self.previous_genders))
-        self.previous_numbers = list({p.number for p in possible}.intersection(self.previous_numbers))
-        self.previous_conjugations = list({p.conjugation for p in possible}.intersection(self.previous_conjugations))
-        if self.index == len(self.categorized_words) or category.type == WordType.NOUN:
-            return None
-        previous = category
-        possible = None
-        category = self.categorized_words[self.index]
-        word = self.words[self.index]
-        length = len(word)
-
-        if category is None:  # suggest new words
-            return Result(self.position, length,
-                          [w for w in chain(self.nouns.get(conjugation=Conjugation.NOM, gender=self.previous_genders, number=self.previous_numbers)) if
-                           w.word.startswith(word)],
-                          "Unrecognized word")
-        elif category.type == WordType.VERB:
-            return Result(self.position, length, [], "Third word should be a noun not a verb.")
-        elif category.type == WordType.NOUN:
-            possible = self.nouns.get_all(category.word)
-            if Conjugation.NOM not in [p.conjugation for p in possible]:
-                return Result(self.position, length,
-                              self.nouns.get(word=category.word, conjugation=Conjugation.NOM, gender=self.previous_genders,
-                                             number=self.previous_numbers),
-                              f"Subject should be in nominative form. But is in {category.conjugation.value}.")
-            elif not [p.gender for p in possible if p.gender in self.previous_genders]:
-                return Result(self.position, length,
-                              self.adjectives.get(word=category.word, conjugation=Conjugation.NOM,
-                                                  gender=self.previous_genders,
-                                                  number=self.previous_numbers),
-                              f"Subject should match the gender of the previous word: {[p.value for p in self.previous_genders]}. But is in {category.gender.value}.")
-            elif not [p.number for p in possible if p.number in self.previous_numbers]:
-                return Result(self.position, length,
-                              self.adjectives.get(word=category.word, conjugation=Conjugation.NOM,
-                                                  gender=self.previous_genders,
-                                                  number=self.previous_numbers),
-                              f"Subject should match the number of the previous word: {[p.value for p in self.previous_numbers]}. But is in {category.number.value}.")
-        elif category.type == WordType.ADJECTIVE:
-            return Result(self.position, length, [], "Two adjectives are not allowed.")
-        elif category.type == WordType.PRONOUN:
-            return Result(self.position, length, [], f"Subject's pronoun should always be first.")
-        else:
-            raise ValueError("Something unexpected happened.")
+    @property
+    def nouns(self) -> Nouns:
+        return self.lexicon.nouns
 
-        self.index += 1
-        self.position += length + 1
+    @property
+    def verbs(self) -> Verbs:
+        return self.lexicon.verbs
 
-        return None
+    @property
+    def adjectives(self) -> Adjectives:
+        return self.lexicon.adjectives
 
-    def parse_verb(self):
-        # one verb only
-        category = self.categorized_words[self.index]
-        word = self.words[self.index]
-        length = len(word)
-        if category is None:  # suggest new words
-            return Result(self.position, length,
-                          [w for w in self.verbs.get(gender=self.previous_genders, number=self.previous_numbers, person=Person.THIRD) if
-                           Levenshtein.distance(w.word, word) <= 2 or w.word.startswith(word)],
-                          "Unrecognized word")
-        elif category.type == WordType.VERB:
-            if category.number is None:  # it's just the base
-                return Result(self.position, length,
-                              self.verbs.get(base=category.word, gender=self.previous_genders, number=self.previous_numbers,
-                                             person=Person.THIRD),
-                              f"Verb should match the noun number: {[p.value for p in self.previous_numbers]}. But is the verb is not conjugated.")
-            if category.number not in self.previous_numbers:
-                return Result(self.position, length,
-                              self.verbs.get(word=category.word, gender=self.previous_genders, number=self.previous_numbers,
-                                             person=Person.THIRD),
-                              f"Verb should match the noun number: {[p.value for p in self.previous_numbers]}. But is {category.number.value}.")
-            if category.gender not in self.previous_genders and category.gender is not None:
-                return Result(self.position, length,
-                              self.verbs.get(word=category.word, gender=self.previous_genders, number=self.previous_numbers,
-                                             person=Person.THIRD),
-                              f"Verb gender should match the noun gender: {[p.value for p in self.previous_genders]}. But is {category.gender.value}.")
-            if category.person != Person.THIRD:
-                return Result(self.position, length,
-                              self.verbs.get(word=category.word, gender=self.previous_genders, number=self.previous_numbers,
-                                             person=Person.THIRD),
-                              f"Verb should be in 3rd person. But is {category.person.value}.")
-        elif category.type == WordType.NOUN:
-            return Result(self.position, length, [], "Subject should be followed be a verb not a noun.")
-        elif category.type == WordType.ADJECTIVE:
-            return Result(self.position, length, [], "Subject should be followed be a verb not an adjective.")
-        elif category.type == WordType.PRONOUN:
-            return Result(self.position, length, [], "Subject should be followed be a verb not a pronoun.")
-        else:
-            raise ValueError("Something unexpected happened.")
+    @property
+    def pronouns(self) -> Pronouns:
+        return self.lexicon.pronouns
 
-        self.index += 1
-        self.position += length + 1
+    @property
+    def previous_genders(self) -> list[Gender | None]:
+        return self._previous("gender")
 
-        return None
+    @property
+    def previous_numbers(self) -> list[Number | None]:
+        return self._previous("number")
 
-    def parse_object(self):
-        self.previous_genders = list()
-        self.previous_numbers = list()
-        self.previous_conjugations = list()
-        # first word
-        verb = self.categorized_words[self.index - 1]
-        category = self.categorized_words[self.index]
-        word = self.words[self.index]
-        length = len(word)
-        possible = None
-        if category is None:  # suggest new words
-            return Result(self.position, length,
-                          [w for w in chain(self.nouns.get(conjugation=verb.conjugation),
-                                            self.adjectives.get(conjugation=verb.conjugation),
-                                            self.pronouns.get(conjugation=verb.conjugation)) if w.word.startswith(word)],
-                          "Unrecognized word")
-        elif category.type == WordType.VERB:
-            return Result(self.position, length, [], "Verb should be followed by a noun, adjective or pronoun not a verb.")
-        elif category.type == WordType.NOUN:
-            possible = self.nouns.get_all(category.word)
-            if verb.conjugation not in [p.conjugation for p in possible]:
-                return Result(self.position, length,
-                              self.nouns.get(word=category.word, conjugation=verb.conjugation, gender=category.gender,
-                                             number=category.number),
-                              f"Object should be in {verb.conjugation.value} form. But is in {category.conjugation.value}.")
-        elif category.type == WordType.ADJECTIVE:
-            possible = self.adjectives.get_all(category.word)
-            if verb.conjugation not in [p.conjugation for p in possible]:
-                return Result(self.position, length,
-                              self.adjectives.get(word=category.word, conjugation=verb.conjugation,
-                                                  gender=category.gender,
-                                                  number=category.number),
-                              f"Object's adjective should be in {verb.conjugation.value} form. But is in {category.conjugation.value}.")
-        elif category.type == WordType.PRONOUN:
-            possible = self.adjectives.get_all(category.word)
-            if verb.conjugation not in [p.conjugation for p in possible]:
-                return Result(self.position, length,
-                              self.pronouns.get(word=category.word, conjugation=verb.conjugation, gender=category.gender,
-                                                number=category.number),
-                              f"Object's pronoun should be in {verb.conjugation.value} form. But is in {category.conjugation.value}.")
-        else:
-            raise ValueError("Something unexpected happened.")
+    @property
+    def previous_conjugations(self) -> list[Conjugation | None]:
+        return self._previous("conjugation")
 
-        # second word
-        self.index += 1
-        self.position += length + 1
-        self.previous_genders = list({p.gender for p in possible})
-        self.previous_numbers = list({p.number for p in possible})
-        self.previous_conjugations = list({p.conjugation for p in possible})
-        if self.index == len(self.categorized_words) or category.type == WordType.NOUN:
-            return None
-        previous = category
-        possible = None
-        category = self.categorized_words[self.index]
-        word = self.words[self.index]
-        length = len(word)
-
-        if category is None:  # suggest new words
-            return Result(self.position, length,
-                          [w for w in chain(self.nouns.get(conjugation=verb.conjugation, gender=self.previous_genders, number=self.previous_numbers),
-                                            self.adjectives.get(conjugation=verb.conjugation, gender=self.previous_genders, number=self.previous_numbers)) if
-                           w.word.startswith(word)],
-                          "Unrecognized word")
-        elif category.type == WordType.VERB:
-            return Result(self.position, length, [], "There is only one verb allowed per sentence.")
-        elif category.type == WordType.NOUN:
-            possible = self.nouns.get_all(category.word)
-            if verb.conjugation not in [p.conjugation for p in possible]:
-                return Result(self.position, length,
-                              self.nouns.get(word=category.word, conjugation=verb.conjugation, gender=self.previous_genders,
-                                             number=self.previous_numbers),
-                              f"Object should be in {verb.conjugation} form. But is in {category.conjugation.value}.")
-            elif not [p.gender for p in possible if p.gender in self.previous_genders]:
-                return Result(self.position, length,
-                              self.adjectives.get(word=category.word, conjugation=verb.conjugation,
-                                                  gender=self.previous_genders,
-                                                  number=self.previous_numbers),
-                              f"Object should match the gender of the previous word: {[p.value for p in self.previous_genders]}. But is in {category.gender.value}.")
-            elif not [p.number for p in possible if p.number in self.previous_numbers]:
-                return Result(self.position, length,
-                              self.adjectives.get(word=category.word, conjugation=verb.conjugation,
-                                                  gender=self.previous_genders,
-                                                  number=self.previous_numbers),
-                              f"Object should match the number of the previous word: {[p.value for p in self.previous_numbers]}. But is in {category.number.value}.")
-        elif category.type == WordType.ADJECTIVE:
-            possible = self.adjectives.get_all(category.word)
-            if previous.type == WordType.ADJECTIVE:
-                return Result(self.position, length, [], "Two adjectives are not allowed.")
-            elif verb.conjugation not in [p.conjugation for p in possible]:
-                return Result(self.position, length,
-                              self.adjectives.get(word=category.word, conjugation=verb.conjugation,
-                                                  gender=self.previous_genders,
-                                                  number=self.previous_numbers),
-                              f"Object's adjective should be in nominative form. But is in {category.conjugation.value}.")
-            elif not [p.gender for p in possible if p.gender in self.previous_genders]:
-                return Result(self.position, length,
-                              self.adjectives.get(word=category.word, conjugation=verb.conjugation,
-                                                  gender=self.previous_genders,
-                                                  number=self.previous_numbers),
-                              f"Object's adjective should match the gender of the previous word: {[p.value for p in self.previous_genders]}. But is in {category.gender.value}.")
-            elif not [p.number for p in possible if p.number in self.previous_numbers]:
-                return Result(self.position, length,
-                              self.adjectives.get(word=category.word, conjugation=verb.conjugation,
-                                                  gender=self.previous_genders,
-                                                  number=self.previous_numbers),
-                              f"Object's adjective should match the number of the previous word: {[p.value for p in self.previous_numbers]}. But is in {category.number.value}.")
-            possible = self.adjectives.get_all(category.word)
-        elif category.type == WordType.PRONOUN:
-            return Result(self.position, length, [], f"Object's pronoun should always be first after the verb.")
-        else:
-            raise ValueError("Something unexpected happened.")
+    def _previous(self, field: str) -> list:
+        """
+        Values of the field agreed on so far, as a list. Only reasons and suggestions need them, so they are made
+        from the agreed words when asked for, in the order the sets of the words give them.
+        """
+        values = list()
+        for i, (index, type) in enumerate(self.agreed):
+            possible = self.analyses_of(TYPES_BY_BIT[type], index)
+            if i == 0:
+                values = list({getattr(p, field) for p in possible})
+            else:
+                values = list({getattr(p, field) for p in possible}.intersection(values))
+        return values
 
-        # third word
-        self.index += 1
-        self.position += length + 1
-        self.previous_genders = list({p.gender for p in possible}.intersection(self.previous_genders))
-        self.previous_numbers = list({p.number for p in possible}.intersection(self.previous_numbers))
-        self.previous_conjugations = list({p.conjugation for p in possible}.intersection(self.previous_conjugations))
-        if self.index == len(self.categorized_words) or category.type == WordType.NOUN:
-            return None
-        previous = category
-        possible = None
-        category = self.categorized_words[self.index]
-        word = self.words[self.index]
-        length = len(word)
-
-        if category is None:  # suggest new words
-            return Result(self.position, length,
-                          [w for w in chain(self.nouns.get(conjugation=verb.conjugation, gender=self.previous_genders, number=self.previous_numbers)) if
-                           w.word.startswith(word)],
-                          "Unrecognized word")
-        elif category.type == WordType.VERB:
-            return Result(self.position, length, [], "There is only one verb allowed per sentence.")
-        elif category.type == WordType.NOUN:
-            possible = self.nouns.get_all(category.word)
-            if verb.conjugation not in [p.conjugation for p in possible]:
-                return Result(self.position, length,
-                              self.nouns.get(word=category.word, conjugation=verb.conjugation, gender=self.previous_genders,
-                                             number=self.previous_numbers),
-                              f"Object should be in nominative form. But is in {category.conjugation.value}.")
-            elif not [p.gender for p in possible if p.gender in self.previous_genders]:
-                return Result(self.position, length,
-                              self.adjectives.get(word=category.word, conjugation=verb.conjugation,
-                                                  gender=self.previous_genders,
-                                                  number=self.previous_numbers),
-                              f"Object should match the gender of the previous word: {[p.value for p in self.previous_genders]}. But is in {category.gender.value}.")
-            elif not [p.number for p in possible if p.number in self.previous_numbers]:
-                return Result(self.position, length,
-                              self.adjectives.get(word=category.word, conjugation=verb.conjugation,
-                                                  gender=self.previous_genders,
-                                                  number=self.previous_numbers),
-                              f"Object should match the number of the previous word: {[p.value for p in self.previous_numbers]}. But is in {category.number.value}.")
-        elif category.type == WordType.ADJECTIVE:
-            return Result(self.position, length, [], "Two adjectives are not allowed.")
-        elif category.type == WordType.PRONOUN:
-            return Result(self.position, length, [], f"Subject's pronoun should always be first after a verb.")
-        else:
-            raise ValueError("Something unexpected happened.")
+    def analyses_of(self, type: WordType, index: int | None = None) -> list[Word]:
+        return [a for a in self.analyses[self.index if index is None else index] if a.type == type]
 
-        self.index += 1
-        self.position += length + 1
 
-        return None
+class Parser:
+    """
+    Parses sentences against a lexicon. Keeps no parse state between calls, one instance can serve many threads.
+    The analyses of the tokens it parses are cached, up to cache_size of them, least recently used first out.
+    """
+
+    def __init__(self, lexicon: Lexicon | None = None, max_suggestions: int = SUGGESTIONS,
+                 cache_size: int = TOKEN_CACHE_SIZE):
+        # without an explicit lexicon the shared default one is loaded on first use
+        self._lexicon = lexicon
+        self.max_suggestions = max_suggestions
+        self.cache_size = cache_size
+        # the analyses hold for one lexicon only, the cache is replaced with it
+        self._tokens: tuple[Lexicon | None, LRUCache] = (None, LRUCache(cache_size))
+        self._tokens_lock = Lock()
+
+    @property
+    def lexicon(self) -> Lexicon:
+        return self._lexicon or get_lexicon()
+
+    @property
+    def nouns(self) -> Nouns:
+        return self.lexicon.nouns
+
+    @property
+    def verbs(self) -> Verbs:
+        return self.lexicon.verbs
+
+    @property
+    def adjectives(self) -> Adjectives:
+        return self.lexicon.adjectives
+
+    @property
+    def pronouns(self) -> Pronouns:
+        return self.lexicon.pronouns
+
+    def analyze(self, word: str, lexicon: Lexicon | None = None) -> tuple[Word, ...]:
+        """Lexicon.analyze of the word, from the token cache when it was analyzed before."""
+        lexicon = lexicon or self.lexicon
+        cache = self._token_cache(lexicon)
+        analyses = cache.get(word)
+        if analyses is None:
+            analyses = lexicon.analyze(word)
+            cache.put(word, analyses)
+        return analyses
+
+    def _token_cache(self, lexicon: Lexicon) -> LRUCache:
+        cached, cache = self._tokens
+        if cached is not lexicon:
+            # a reloaded or another lexicon, nothing cached holds for it
+            with self._tokens_lock:
+                if self._tokens[0] is not lexicon:
+                    self._tokens = (lexicon, LRUCache(self.cache_size))
+                cache = self._tokens[1]
+        return cache
+
+    def cache_info(self) -> CacheInfo:
+        """Token cache statistics, since the lexicon parsed against last changed."""
+        return self._tokens[1].info()
 
     def parse(self, string: str) -> Result | None:
+        return self._parse(string, self.lexicon)
+
+    def _parse(self, string: str, lexicon: Lexicon) -> Result | None:
         string = string.lstrip()
-        self.words = string.split()
         if len(string) == 0:
             return None
-        self.categorized_words = self.categorize_string(string)
-        # failed to categorized
-        self.index = 0
-        self.position = 0
-        result = self.parse_subject()
-        if result:
-            return result
-
-        if self.index == len(self.categorized_words):
-            return None
-
-        result = self.parse_verb()
-        if result:
-            return result
-
-        if self.index == len(self.categorized_words):
-            return None
-
-        result = self.parse_object()
-        if result:
-            return result
-
-        if self.index == len(self.categorized_words):
-            return None
+        return self.parse_analyzed(string.split(), self.analyze_string(string, lexicon), lexicon)
 
+    def parse_all(self, string: str) -> list[Result]:
+        """Every error of the string, recovering after each one (see parse_analyzed_all). The first is parse's."""
+        lexicon = self.lexicon
+        string = string.lstrip()
+        if len(string) == 0:
+            return []
+        return self.parse_analyzed_all(string.split(), self.analyze_string(string, lexicon), lexicon)
+
+    def parse_many(self, strings: Iterable[str]) -> list[Result | None]:
+        """
+        Parses every string like parse does. Every distinct word of the batch is looked up once, through the token
+        cache, and the suggestions of the errors are shared between the strings. The grammar takes most of a parse,
+        so a batch is only a little faster than a loop of parse until the suggestions are read, then several times
+        faster (see benchmarks/parse_many.py).
+        """
+        lexicon = self.lexicon
+        suggestions = dict()
+        return [None if sentence is None else self.parse_analyzed(*sentence, lexicon, suggestions)
+                for sentence in self._analyze_many(strings, lexicon)]
+
+    def parse_many_all(self, strings: Iterable[str]) -> list[list[Result]]:
+        """Every error of every string like parse_all, looking words up like parse_many."""
+        lexicon = self.lexicon
+        suggestions = dict()
+        return [[] if sentence is None else self.parse_analyzed_all(*sentence, lexicon, suggestions)
+                for sentence in self._analyze_many(strings, lexicon)]
+
+    def _analyze_many(self, strings: Iterable[str], lexicon: Lexicon
+                      ) -> Iterator[tuple[list[str], list[tuple[Word, ...]]] | None]:
+        """
+        Words and analyses of every string like analyze_string, None for blank ones, each word analyzed once. They
+        are made a string at a time while it's parsed, the batch only keeps the analyses of its distinct words.
+        """
+        # a word met before in the batch is taken from here, without the lock and the reordering of the token cache
+        tokens: dict[str, tuple[Word, ...]] = dict()
+        for string in strings:
+            string = string.lstrip()
+            if len(string) == 0:
+                yield None
+                continue
+            words = string.split()
+            analyses = list()
+            for word in words:
+                analysis = tokens.get(word)
+                if analysis is None:
+                    analysis = tokens[word] = self.analyze(word, lexicon)
+                analyses.append(analysis)
+            # same as analyze_string, the last word is unfinished without a space after it
+            if not string.endswith(" ") and not string.endswith("\n"):
+                analyses[-1] = ()
+            yield words, analyses
+
+    def parse_analyzed(self, words: list[str], analyses: list[tuple[Word, ...]], lexicon: Lexicon | None = None,
+                       suggestions: dict | None = None) -> Result | None:
+        """Parses words already looked up in the lexicon, with analyses like those of analyze_string."""
+        state = ParseState(lexicon or self.lexicon, words, analyses, suggestions)
+        for constituent in COMPILED_SENTENCE:
+            result = self.parse_constituent(constituent, state)
+            if result or state.index == len(state.words):
+                return result
         return None
 
+    def parse_constituent(self, constituent: CompiledConstituent, state: ParseState, then: int = 0
+                          ) -> Result | None:
+        """
+        Runs the rules of the constituent (see grammar.py) from the next word of the state, from its rules then when
+        given, those it was rejected in.
+        """
+        if not then:
+            if constituent.agree_anew:
+                state.features = 0
+                state.agreed = list()
+            case = constituent.case
+            if case == GOVERNED:
+                case = state.categorized_words[state.last].conjugation
+            state.case = case
+        case_bit = FEATURE_BITS["conjugation"][state.case]
+        words, analyses, categorized_words = state.words, state.analyses, state.categorized_words
+        rules = constituent.rules[then]
+        while True:
+            category = categorized_words[state.index]
+            rule = rules[0 if category is None else category.code & TYPE_BITS]
+            if rule.reject is not None:
+                state.then = then
+                return self.reject(state, rule.reject.reason, rule.reject.suggest)
+
+            # features of all the analyses of the type, a word has one type bit
+            type = rule.analyses or category.code & TYPE_BITS
+            possible = 0
+            for analysis in analyses[state.index]:
+                if analysis.code & type:
+                    possible |= analysis.code
+            for check in rule.checks:
+                required = check.values
+                if check.agreed:
+                    required |= state.features
+                if check.case:
+                    required |= case_bit
+                if not (category.code if check.of_word else possible) & required & check.field:
+                    state.then = then
+                    return self.reject(state, check.check.reason, check.check.suggest)
+
+            if rule.agree == "start":
+                state.features = possible & AGREEMENT_BITS
+                state.agreed = [(state.index, type)]
+            elif rule.agree == "narrow":
+                state.features &= possible
+                state.agreed.append((state.index, type))
+            state.position += len(words[state.index]) + 1
+            state.index += 1
+            if rule.then is None or state.index == len(words):
+                return None
+            then = rule.then
+            rules = constituent.rules[then]
+
+    def reject(self, state: ParseState, reason: str, suggest: Suggest | None) -> Result:
+        # the suggestions are only looked for when read, most diagnostics never need them
+        expected = [] if suggest is None else Suggestions(partial(self.suggest, state, suggest))
+        return Result(state.position, len(state.word), expected, reason.format_map(ReasonFields(state)))
+
+    def suggest(self, state: ParseState, suggest: Suggest) -> list[Word]:
+        """The best max_suggestions candidates of the suggester for the word of the state, see suggestions.rank."""
+        # ranked by what follows the word before in the corpus too
+        last = state.last
+        previous = state.words[last] if last >= 0 else None
+        if state.suggestions is None:
+            return rank(suggest(state), self.max_suggestions, previous)
+        # shared whatever the word before, which only reorders the shortlist
+        category = state.category
+        key = (suggest, state.word, category and (category.word, category.code), state.case,
+               frozenset(state.previous_genders), frozenset(state.previous_numbers), self.max_suggestions)
+        if key not in state.suggestions:
+            state.suggestions[key] = shortlist(suggest(state), self.max_suggestions)
+        return rank(state.suggestions[key], self.max_suggestions, previous)
+
+    def parse_analyzed_all(self, words: list[str], analyses: list[tuple[Word, ...]], lexicon: Lexicon | None = None,
+                           suggestions: dict | None = None) -> list[Result]:
+        """
+        Every error of the words, parsing on after each one. A word in a wrong form is taken as the forms the
+        parser expected of it and the parse goes on from there. A word that doesn't fit at all, or still doesn't
+        after that, is skipped. The first error is the one of parse_analyzed, positions are those of the words.
+        One parse goes through the words, on from the rules of the error after each one.
+        """
+        if not words:
+            return []
+        # the analyses of the words repaired change, the given ones stay
+        state = ParseState(lexicon or self.lexicon, words, list(analyses), suggestions)
+        results = list()
+        repaired = -1
+        for constituent in COMPILED_SENTENCE:
+            then = 0
+            while result := self.parse_constituent(constituent, state, then):
+                results.append(result)
+                # the suggestions are found here, before the state moves on
+                index = state.index
+                types = {a.type for a in state.analyses[index]} or {w.type for w in result.expected}
+                forms = tuple(w for w in result.expected if w.type in types)
+                if forms and index != repaired:
+                    state.analyses[index] = forms
+                    state.categorized_words[index] = forms[0]
+                    repaired = index
+                else:
+                    state.skip()
+                    if state.index == len(state.words):
+                        return results
+                then = state.then
+            if state.index == len(state.words):
+                return results
+        return results
+
     def categorize_string(self, string: str) -> list[Word | None]:
+        return [a[0] if a else None for a in self.analyze_string(string)]
+
+    def analyze_string(self, string: str, lexicon: Lexicon | None = None) -> list[tuple[Word, ...]]:
         words = string.split()
+        lexicon = lexicon or self.lexicon
         # skip the last word is has not been finished with space
         # TODO it should know and categorize if there is only one option
         if not string.endswith(" ") and not string.endswith("\n"):
-            return [self.categorize(w) for w in words[:-1]] + [None]
+            return [self.analyze(w, lexicon) for w in words[:-1]] + [()]
         else:
-            return [self.categorize(w) for w in words]
+            return [self.analyze(w, lexicon) for w in words]
 
     def categorize(self, word: str) -> Word | None:
-        # TODO categorize verb by their base 'słuchać'
-        for attr in [self.nouns, self.verbs, self.adjectives, self.pronouns]:
-            categorized = attr.get_one(word=word)
-            if categorized:
-                return categorized
+        analyses = self.analyze(word)
+        return analyses[0] if analyses else None
 
-        return None
+    def lemmatize(self, word: str) -> list[Word]:
+        """Base forms of the word, e.g. 'słuchać' for 'słuchał'."""
+        return list(self.lexicon.lemmas(word))
 
     def parse_multiple(self, string: str) -> ResultMultiple | None:
         strings: list[str] = string.split("\n")
@@ -488,13 +426,23 @@ class Parser:
             strings[i].rstrip()
             strings[i] += "\n"
 
+        # every line against the same lexicon
+        lexicon = self.lexicon
         for i, s in enumerate(strings):
-            result = self.parse(s)
+            result = self._parse(s, lexicon)
             if result:
                 return ResultMultiple(i, result.position, result.length, result.expected, result.reason)
 
         return None
 
+    def parse_multiple_all(self, string: str) -> list[ResultMultiple]:
+        """Every error of every line, recovering after each one like parse_all, in one pass over the text."""
+        lines = string.split("\n")
+        for i in range(len(lines) - 1):
+            lines[i] += "\n"
+        return [ResultMultiple(row, result.position, result.length, result.expected, result.reason)
+                for row, results in enumerate(self.parse_many_all(lines)) for result in results]
+
 
 if __name__ == "__main__":
     my_parser = Parser()
@@ -0,0 +1,310 @@
+"""
+Grammar checking over HTTP.
+
+An asyncio JSON service around Parser, for other programs to check texts with:
+
+    POST /check   {"text": "ładna pies "}
+               -> {"problems": [{"row": 0, "position": 0, "length": 5, "reason": "...", "suggestions": [...]}]}
+    GET /health   {"status": "ok"}
+    GET /stats    requests, batches, rejections, timeouts and errors so far
+
+The problems of a text are those of Parser.parse_multiple_all, in the format of check.py. The
+requests arriving within a short window are parsed together, their lines in one
+Parser.parse_many_all call which looks every distinct word up once, in a thread so that requests
+are read meanwhile. At most max_pending requests wait for a parse, more are answered 503 at once,
+and a request not parsed within its timeout is answered 504. A text of more than MAX_WORDS words,
+or with a line of more than MAX_LINE_WORDS, is answered 413, so that no parse holds the batches
+after it up for long. A request of more than MAX_HEADERS header fields or MAX_HEADER_BYTES of them
+is answered 431. Connections are kept alive.
+
+Usage:
+    python -m polish_parser.server [--host 127.0.0.1] [--port 8765] [--window 5] [--timeout 5]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+from http import HTTPStatus
+
+from .check import problem
+from .lexicon import Lexicon
+from .parser import Parser, ResultMultiple
+from .suggestions import get_successor_index
+
+MAX_BODY = 1 << 20  # bytes of a request
+MAX_HEADERS = 100  # header fields of a request
+MAX_HEADER_BYTES = 1 << 15  # bytes of the header fields of a request, a line is also capped by the StreamReader
+MAX_WORDS = 10_000  # of a text, its parse takes well under a second however many errors it has
+MAX_LINE_WORDS = 1_000  # of a line of a text
+
+
+class Overloaded(Exception):
+    """Too many requests wait for a parse already."""
+
+
+class TooLong(Exception):
+    """A text has more words than a request may."""
+
+
+class CheckService:
+    """
+    Checks the texts of concurrent callers in batches. check() can be awaited directly, serve() puts the service
+    behind HTTP. A batch waits window seconds for more requests after its first, unless some wait already, and
+    takes requests up to max_batch lines and MAX_WORDS words; a larger request is a batch of its own.
+    """
+
+    def __init__(self, parser: Parser | None = None, window: float = 0.005, max_batch: int = 10_000,
+                 max_pending: int = 1000, timeout: float = 5.0):
+        self.parser = parser or Parser()
+        self.window = window
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.stats = dict(requests=0, batches=0, lines=0, rejected=0, timeouts=0, errors=0)
+        self._queue: asyncio.Queue | None = None
+        self._batcher: asyncio.Task | None = None
+
+    async def check(self, text: str) -> list[dict]:
+        """
+        Problems of the text. Raises TooLong for a text of too many words, Overloaded when max_pending requests
+        wait, TimeoutError after timeout.
+        """
+        if self._batcher is None:
+            self._queue = asyncio.Queue(self.max_pending)
+            self._batcher = asyncio.create_task(self._run_batches())
+        lines = text.split("\n")
+        n_words = 0
+        for i, line in enumerate(lines):
+            words = len(line.split())
+            if words > MAX_LINE_WORDS:
+                raise TooLong(f"A line has at most {MAX_LINE_WORDS} words, line {i} has {words}.")
+            n_words += words
+        if n_words > MAX_WORDS:
+            raise TooLong(f"A text has at most {MAX_WORDS} words, this one has {n_words}.")
+        for i in range(len(lines) - 1):
+            lines[i] += "\n"
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((lines, n_words, future))
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            raise Overloaded(f"{self.max_pending} requests are waiting already.") from None
+        self.stats["requests"] += 1
+        try:
+            # cancels the future on timeout, the batches skip it then
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise
+
+    async def close(self):
+        if self._batcher is not None:
+            self._batcher.cancel()
+            await asyncio.gather(self._batcher, return_exceptions=True)
+            self._batcher = None
+
+    async def _run_batches(self):
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        while True:
+            lines, n_words, future = await queue.get()
+            batch = [(lines, future)]
+            if queue.empty():
+                await asyncio.sleep(self.window)
+            n_lines = len(lines)
+            while n_lines < self.max_batch and n_words < MAX_WORDS and not queue.empty():
+                lines, words, future = queue.get_nowait()
+                batch.append((lines, future))
+                n_lines += len(lines)
+                n_words += words
+            # requests given up on while they waited aren't parsed
+            batch = [(lines, future) for lines, future in batch if not future.done()]
+            if not batch:
+                continue
+            self.stats["batches"] += 1
+            self.stats["lines"] += sum(len(lines) for lines, _ in batch)
+            try:
+                found = await loop.run_in_executor(None, self._parse, [lines for lines, _ in batch])
+            except Exception as e:
+                found = [e]
+                if len(batch) > 1:
+                    # a text the parser fails on fails only its own request, the others are parsed again one by one
+                    found = list()
+                    for lines, future in batch:
+                        try:
+                            found.append(None if future.done() else
+                                         (await loop.run_in_executor(None, self._parse, [lines]))[0])
+                        except Exception as error:
+                            found.append(error)
+            for (_, future), problems in zip(batch, found):
+                if future.done():
+                    continue
+                if isinstance(problems, Exception):
+                    future.set_exception(problems)
+                else:
+                    future.set_result(problems)
+
+    def _parse(self, texts: list[list[str]]) -> list[list[dict]]:
+        """Problems of every text, given as lines, parsed at once. The suggestions are found here too."""
+        results = self.parser.parse_many_all([line for lines in texts for line in lines])
+        problems = list()
+        start = 0
+        for lines in texts:
+            problems.append([problem(ResultMultiple(row, result.position, result.length, result.expected,
+                                                    result.reason))
+                             for row, found in enumerate(results[start:start + len(lines)]) for result in found])
+            start += len(lines)
+        return problems
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765):
+        """Answers HTTP requests until cancelled, the lexicon loaded before the first."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, lambda: (self.parser.lexicon, get_successor_index()))
+        server = await asyncio.start_server(self._connection, host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.close()
+
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    # a line longer than the limit of the reader raises ValueError too
+                    request_line = await reader.readline()
+                    if not request_line:
+                        return
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._refuse(reader, writer, HTTPStatus.BAD_REQUEST, "Bad request line.")
+                    return
+                headers = await self._read_headers(reader)
+                if headers is None:
+                    await self._refuse(reader, writer, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+                                       f"A request has at most {MAX_HEADERS} header fields of {MAX_HEADER_BYTES} "
+                                       f"bytes.")
+                    return
+                length = headers.get("content-length", "0")
+                if not length.isdigit():
+                    await self._refuse(reader, writer, HTTPStatus.BAD_REQUEST, "Bad Content-Length.")
+                    return
+                if int(length) > MAX_BODY:
+                    await self._refuse(reader, writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                       f"A request has at most {MAX_BODY} bytes.")
+                    return
+                body = await reader.readexactly(int(length))
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                try:
+                    status, reply = await self._handle(method, target.partition("?")[0], body)
+                except Exception as e:
+                    # a bug shows in the reply, the connection and the service go on
+                    self.stats["errors"] += 1
+                    status, reply = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(e).__name__}: {e}"}
+                await self._respond(writer, status, reply, keep_alive)
+                if not keep_alive:
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _refuse(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, status: HTTPStatus,
+                      error: str):
+        """
+        Answers a request which isn't read to its end and ends the connection. What the client still sends is
+        read and dropped for a second, closing with it unread would reset the connection before the answer is read.
+        """
+        await self._respond(writer, status, {"error": error}, False)
+        if writer.can_write_eof():
+            writer.write_eof()
+
+        async def drop():
+            while await reader.read(1 << 16):
+                pass
+        try:
+            await asyncio.wait_for(drop(), 1.0)
+        except (asyncio.TimeoutError, ValueError):
+            pass
+
+    @staticmethod
+    async def _read_headers(reader: asyncio.StreamReader) -> dict[str, str] | None:
+        """Header fields of a request by lowercase name, None when there are too many or they are too long."""
+        headers = dict()
+        n_fields = n_bytes = 0
+        try:
+            while (line := await reader.readline()).strip():
+                n_fields += 1
+                n_bytes += len(line)
+                if n_fields > MAX_HEADERS or n_bytes > MAX_HEADER_BYTES:
+                    return None
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+        except ValueError:
+            return None
+        return headers
+
+    async def _handle(self, method: str, path: str, body: bytes) -> tuple[HTTPStatus, dict]:
+        if path == "/health" and method == "GET":
+            return HTTPStatus.OK, {"status": "ok"}
+        if path == "/stats" and method == "GET":
+            pending = self._queue.qsize() if self._queue is not None else 0
+            return HTTPStatus.OK, {**self.stats, "pending": pending,
+                                   "token_cache_hit_rate": self.parser.cache_info().hit_rate}
+        if path != "/check":
+            return HTTPStatus.NOT_FOUND, {"error": f"No {path}, texts are checked by POST /check."}
+        if method != "POST":
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "Texts are checked by POST /check."}
+        try:
+            text = json.loads(body)["text"]
+            if not isinstance(text, str):
+                raise TypeError
+        except (ValueError, KeyError, TypeError):
+            return HTTPStatus.BAD_REQUEST, {"error": 'Expected a JSON object with the text, {"text": "..."}.'}
+        try:
+            return HTTPStatus.OK, {"problems": await self.check(text)}
+        except TooLong as e:
+            return HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": str(e)}
+        except Overloaded as e:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"error": str(e)}
+        except asyncio.TimeoutError:
+            return HTTPStatus.GATEWAY_TIMEOUT, {"error": f"Not checked within {self.timeout} s."}
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: HTTPStatus, reply: dict, keep_alive: bool):
+        body = json.dumps(reply, ensure_ascii=False).encode("utf-8")
+        head = [f"HTTP/1.1 {status.value} {status.phrase}", "Content-Type: application/json; charset=utf-8",
+                f"Content-Length: {len(body)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if status == HTTPStatus.SERVICE_UNAVAILABLE:
+            head.append("Retry-After: 1")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arguments.add_argument("--host", default="127.0.0.1")
+    arguments.add_argument("--port", type=int, default=8765)
+    arguments.add_argument("--window", type=float, default=5, help="milliseconds a batch waits for more requests")
+    arguments.add_argument("--max-batch", type=int, default=10_000, help="lines parsed at once")
+    arguments.add_argument("--max-pending", type=int, default=1000, help="requests waiting before 503")
+    arguments.add_argument("--timeout", type=float, default=5, help="seconds before 504")
+    arguments.add_argument("--lexicon", help="compiled lexicon to check against, e.g. one made by the importer")
+    args = arguments.parse_args()
+
+    lexicon = None
+    if args.lexicon is not None:
+        from .binary_lexicon import LexiconFile
+        lexicon = Lexicon.from_file(LexiconFile.open(args.lexicon))
+    service = CheckService(Parser(lexicon), args.window / 1000, args.max_batch, args.max_pending, args.timeout)
+    print(f"Serving on http://{args.host}:{args.port}", file=sys.stderr)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
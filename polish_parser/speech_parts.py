@@ -1,14 +1,43 @@
+from __future__ import annotations
+
 from enum import Enum
-from itertools import product
-from typing import Any, Type
-import os
+from functools import cache
+from threading import Lock
+from typing import Any, Callable, Type, TYPE_CHECKING
+
+from .cache import LRUCache
 
-import pandas as pd
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from .binary_lexicon import LexiconFile, PartTable, StringTable
 
 _Unset = None
 
+_lexicon_file: LexiconFile | None = None
+_lexicon_file_lock = Lock()
+
+# get() results kept per lexicon table, suggestion queries repeat a lot while typing
+QUERY_CACHE_SIZE = 1024
+
+
+def get_lexicon_file() -> LexiconFile:
+    """Get or open the compiled lexicon shared by all lexicon classes"""
+    global _lexicon_file
+    # numpy and the file are only needed once a lexicon is used, importing the package stays cheap
+    from .binary_lexicon import load
+
+    with _lexicon_file_lock:
+        if _lexicon_file is None:
+            _lexicon_file = load()
+    return _lexicon_file
+
 
-module_dir = os.path.dirname(os.path.abspath(__file__))
+def replace_lexicon_file(lexicon_file: LexiconFile):
+    """Share another compiled lexicon from now on, lexicon classes already made from the old one keep it"""
+    global _lexicon_file
+    with _lexicon_file_lock:
+        _lexicon_file = lexicon_file
 
 
 class Number(Enum):
@@ -67,6 +96,9 @@ class WordType(Enum):
 
 
 class Word:
+    # one canonical instance per form and column is shared by all queries (see WordPool), treat it as immutable
+    __slots__ = ("word", "number", "conjugation", "gender", "person", "tense", "mood", "type", "code")
+
     def __init__(
             self,
             word: str,
@@ -86,6 +118,7 @@ class Word:
         self.tense: Tense | None = tense
         self.mood: Mood | None = mood
         self.type: WordType = type
+        self.code: int = encode(self)  # the features as bits, see FEATURES
 
     def __str__(self):
         return f"{self.word}"
@@ -140,22 +173,229 @@ def get_possibilities(variable: Any, enum: Type[Enum]):
         return [variable]
 
 
+# Every feature gets one bit per value plus one bit for a missing value, so a word's features pack into
+# a single int and a list of allowed values is a mask. A word matches if it shares a bit with every mask.
+FEATURES: tuple[tuple[str, Type[Enum]], ...] = (
+    ("number", Number),
+    ("conjugation", Conjugation),
+    ("gender", Gender),
+    ("person", Person),
+    ("tense", Tense),
+    ("mood", Mood),
+    ("type", WordType),
+)
+
+
+def _feature_bits() -> dict[str, dict[Enum | None, int]]:
+    bits: dict[str, dict[Enum | None, int]] = dict()
+    offset = 0
+    for field, enum in FEATURES:
+        bits[field] = {value: 1 << (offset + i) for i, value in enumerate([None, *enum])}
+        offset += len(enum) + 1
+    return bits
+
+
+FEATURE_BITS = _feature_bits()
+FEATURE_INDEX = {field: i for i, (field, _) in enumerate(FEATURES)}
+
+
+def encode(word: Word) -> int:
+    code = 0
+    for field, _ in FEATURES:
+        code |= FEATURE_BITS[field][getattr(word, field)]
+    return code
+
+
+@cache
+def decode(code: int) -> tuple[Enum | None, ...]:
+    """Returns (number, conjugation, gender, person, tense, mood, type) encoded in the code."""
+    return tuple(next(value for value, bit in FEATURE_BITS[field].items() if code & bit) for field, _ in FEATURES)
+
+
+def column_features(column_name: str, type: WordType) -> int:
+    return encode(Word.from_str("", column_name, type))
+
+
+def lemma_columns(columns: list[str], type: WordType) -> list[int]:
+    """
+    For every column, the column of the same row holding its lemma: the base form of a verb, the singular
+    nominative of a noun's gender (a noun row holds a word of every gender) or the masculine singular nominative.
+    """
+    index = {c: i for i, c in enumerate(columns)}
+    if type == WordType.VERB:
+        return [index["VERB"]] * len(columns)
+    if type == WordType.NOUN:
+        return [index[f"SG_NOM_{c.rsplit('_', 1)[-1]}"] for c in columns]
+    return [index["SG_NOM_M"]] * len(columns)
+
+
+def feature_mask(field: str, values: list[Enum | None]) -> int:
+    mask = 0
+    for value in values:
+        mask |= FEATURE_BITS[field][value]
+    return mask
+
+
+def feature_masks(**possibilities: Any) -> list[int]:
+    """Masks of the given fields, e.g. feature_masks(conjugation=Conjugation.NOM, gender=[Gender.M, Gender.F])."""
+    enums = dict(FEATURES)
+    return [feature_mask(field, get_possibilities(values, enums[field])) for field, values in possibilities.items()]
+
+
+def matches(code: int, masks: list[int]) -> bool:
+    return all(code & mask for mask in masks)
+
+
+class WordPool:
+    """
+    Canonical Word for every (form, column) of a table. A Word is made the first time it's needed,
+    so opening a large lexicon stays cheap, and every later query returns the same instance.
+    """
+
+    def __init__(self, table: PartTable, strings: StringTable):
+        self.table = table
+        self.strings = strings
+        self.codes: list[int] = table.features.tolist()
+        self.columns = [decode(code) for code in self.codes]
+        self.words: dict[int, Word] = dict()
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def get(self, string_id: int, column: int) -> Word:
+        key = string_id * self.table.n_columns + column
+        word = self.words.get(key)
+        if word is None:
+            word = self.words.setdefault(key, Word(self.strings[string_id], *self.columns[column]))
+        return word
+
+    def analyses(self, string_id: int) -> list[Word]:
+        """Words of every column holding the form, in column order."""
+        return [self.get(string_id, column) for column in self.table.column_ids_of(string_id)]
+
+
+class LemmaIndex:
+    """
+    Lemma <-> form lookups of a table. The postings give the cells of a form and every column knows the column
+    of its lemma, so a form finds its lemmas and a lemma its paradigms without scanning any row.
+    """
+
+    def __init__(self, pool: WordPool, type: WordType):
+        self.pool = pool
+        self.table = pool.table
+        self.lemma_columns = lemma_columns(self.table.columns, type)
+        self.paradigm_columns: dict[int, list[int]] = dict()  # lemma column -> columns of its paradigm
+        for column, lemma_column in enumerate(self.lemma_columns):
+            self.paradigm_columns.setdefault(lemma_column, []).append(column)
+        self._cells = memoryview(self.table.cells.reshape(-1)).cast("B").cast("i")
+
+    def lemma_cells(self, string_id: int) -> list[int]:
+        """Cells of the lemmas of every paradigm holding the form."""
+        n_columns = self.table.n_columns
+        cells = (cell - cell % n_columns + self.lemma_columns[cell % n_columns]
+                 for cell in self.table.occurrences(string_id))
+        return [cell for cell in dict.fromkeys(cells) if self._cells[cell] >= 0]
+
+    def paradigm_cells(self, string_id: int) -> list[int]:
+        """Cells where the string is a lemma, one per paradigm."""
+        n_columns = self.table.n_columns
+        return [cell for cell in self.table.occurrences(string_id)
+                if self.lemma_columns[cell % n_columns] == cell % n_columns]
+
+    def lemmas(self, string_id: int) -> list[Word]:
+        n_columns = self.table.n_columns
+        return list(dict.fromkeys(self.pool.get(self._cells[cell], cell % n_columns)
+                                  for cell in self.lemma_cells(string_id)))
+
+    def paradigm(self, string_id: int) -> list[Word]:
+        """Words of every paradigm of the lemma, in column order, rows repeating a paradigm add nothing."""
+        n_columns = self.table.n_columns
+        keys: dict[int, None] = dict()  # keys of the pool, one per form and column
+        for cell in self.paradigm_cells(string_id):
+            start = cell - cell % n_columns
+            for column in self.paradigm_columns[cell % n_columns]:
+                form = self._cells[start + column]
+                if form >= 0:
+                    keys[form * n_columns + column] = None
+        return [self.pool.get(key // n_columns, key % n_columns) for key in keys]
+
+    def rows(self, string_id: int) -> list[int]:
+        """Rows where the string is a lemma."""
+        return [cell // self.table.n_columns for cell in self.paradigm_cells(string_id)]
+
+
+def select(pool: WordPool, rows: list[int] | None, **possibilities: list) -> list[Word]:
+    """
+    Words from the table whose features are in the given possibilities, e.g. number=[Number.SG].
+    Words come ordered like the product of the possibilities, then by row.
+    """
+    import numpy as np
+
+    table = pool.table
+    matches = np.ones(table.n_columns, dtype=bool)
+    for field, values in possibilities.items():
+        matches &= (table.features & feature_mask(field, values)) != 0
+    selected = sorted(np.flatnonzero(matches).tolist(),
+                      key=lambda c: tuple(values.index(pool.columns[c][FEATURE_INDEX[field]])
+                                          for field, values in possibilities.items()))
+
+    cells = table.cells if rows is None else table.cells[rows]
+    words: list[Word] = list()
+    for column, string_ids in zip(selected, cells[:, selected].T.tolist()):
+        words.extend(pool.get(string_id, column) for string_id in string_ids if string_id >= 0)
+    return words
+
+
+def cached(cache: LRUCache, key: tuple, query: Callable[[], list[Word]]) -> list[Word]:
+    words = cache.get(key)
+    if words is None:
+        words = tuple(query())
+        cache.put(key, words)
+    return list(words)
+
+
+def to_frame(table: PartTable, strings: StringTable) -> pd.DataFrame:
+    import pandas as pd
+    return pd.DataFrame([[strings[i] if i >= 0 else None for i in row] for row in table.cells.tolist()],
+                        columns=table.columns)
+
+
 class Nouns:
-    nouns: pd.DataFrame
+    table: PartTable
+    strings: StringTable
+    pool: WordPool
+    lemma_index: LemmaIndex
+    cache: LRUCache  # get() results, a freshly loaded lexicon starts with an empty one
 
     @classmethod
-    def from_file(cls):
+    def from_file(cls, lexicon_file: LexiconFile | None = None):
+        lexicon_file = lexicon_file or get_lexicon_file()
         instance = cls()
-        instance.nouns = pd.read_csv(f"{module_dir}/nouns.csv")
+        instance.table = lexicon_file.part("noun")
+        instance.strings = lexicon_file.strings
+        instance.pool = WordPool(instance.table, instance.strings)
+        instance.lemma_index = LemmaIndex(instance.pool, WordType.NOUN)
+        instance.cache = LRUCache(QUERY_CACHE_SIZE)
         return instance
 
+    @property
+    def nouns(self) -> pd.DataFrame:
+        return to_frame(self.table, self.strings)
+
     def get_one(self, word: str) -> Word | None:
-        columns_with_word = next(iter(self.nouns.columns[(self.nouns == word).any()].tolist()), None)  # TODO it can match multiple columns
-        return Word.from_str(word, columns_with_word, WordType.NOUN) if columns_with_word is not None else None
+        analyses = self.pool.analyses(self.strings.find(word))
+        return analyses[0] if analyses else None
 
     def get_all(self, word: str) -> list[Word]:
-        columns_with_word = self.nouns.columns[(self.nouns == word).any()].tolist()
-        return [Word.from_str(word, c, WordType.NOUN) for c in columns_with_word]
+        return self.pool.analyses(self.strings.find(word))
+
+    def get_lemmas(self, word: str) -> list[Word]:
+        """Lemmas of every paradigm holding the word."""
+        return self.lemma_index.lemmas(self.strings.find(word))
+
+    def get_paradigm(self, lemma: str) -> list[Word]:
+        """Every form of the lemma."""
+        return self.lemma_index.paradigm(self.strings.find(lemma))
 
     def get(
             self,
@@ -165,35 +405,55 @@ class Nouns:
             conjugation: Conjugation | _Unset = _Unset,
             gender: Gender | _Unset = _Unset
     ) -> list[Word] | None:
-        number = get_possibilities(number, Number)
-        conjugation = get_possibilities(conjugation, Conjugation)
-        gender = get_possibilities(gender, Gender)
+        possibilities = dict(number=get_possibilities(number, Number),
+                             conjugation=get_possibilities(conjugation, Conjugation),
+                             gender=get_possibilities(gender, Gender))
 
-        columns: list[str] = list()
-        for n, c, g in product(number, conjugation, gender):
-            columns.append(f"{n.name}_{c.name}_{g.name}")
+        def query() -> list[Word]:
+            rows_with_word = None
+            if word is not None:  # used in suggesting fixes
+                rows_with_word = self.table.rows_of(self.strings.find(word))
+            return select(self.pool, rows_with_word, **possibilities)
 
-        if word is not None:  # used in suggesting fixes
-            rows_with_word = self.nouns[(self.nouns == word).any(axis=1)]
-            return [Word.from_str(v, k, WordType.NOUN) for k, col in rows_with_word[columns].items() for v in col]
-
-        return [Word.from_str(v, k, WordType.NOUN) for k, col in self.nouns[columns].items() for v in col]
+        return cached(self.cache, (word, *map(tuple, possibilities.values())), query)
 
 
 class Verbs:
-    verbs: pd.DataFrame
+    table: PartTable
+    strings: StringTable
+    pool: WordPool
+    lemma_index: LemmaIndex
+    cache: LRUCache  # get() results, a freshly loaded lexicon starts with an empty one
 
     @classmethod
-    def from_file(cls):
+    def from_file(cls, lexicon_file: LexiconFile | None = None):
         # TODO data format is wrong, it's always genitive
+        lexicon_file = lexicon_file or get_lexicon_file()
         instance = cls()
-        instance.verbs = pd.read_csv(f"{module_dir}/verbs.csv")
-        instance.verbs.index = instance.verbs["VERB"]
+        instance.table = lexicon_file.part("verb")
+        instance.strings = lexicon_file.strings
+        instance.pool = WordPool(instance.table, instance.strings)
+        instance.lemma_index = LemmaIndex(instance.pool, WordType.VERB)
+        instance.cache = LRUCache(QUERY_CACHE_SIZE)
         return instance
 
+    @property
+    def verbs(self) -> pd.DataFrame:
+        verbs = to_frame(self.table, self.strings)
+        verbs.index = verbs["VERB"]
+        return verbs
+
     def get_one(self, word: str) -> Word | None:
-        columns_with_word = next(iter(self.verbs.columns[(self.verbs == word).any()].tolist()), None)  # TODO it can match multiple columns
-        return Word.from_str(word, columns_with_word, WordType.VERB) if columns_with_word is not None else None
+        analyses = self.pool.analyses(self.strings.find(word))
+        return analyses[0] if analyses else None
+
+    def get_lemmas(self, word: str) -> list[Word]:
+        """Lemmas of every paradigm holding the word."""
+        return self.lemma_index.lemmas(self.strings.find(word))
+
+    def get_paradigm(self, lemma: str) -> list[Word]:
+        """Every form of the lemma."""
+        return self.lemma_index.paradigm(self.strings.find(lemma))
 
     def get(
             self,
@@ -207,46 +467,69 @@ class Verbs:
             tense: Tense | list[Tense] | _Unset = _Unset,
             mood: Mood | list[Mood] | _Unset = _Unset
     ) -> list[Word] | None:
-        number = get_possibilities(number, Number)
-        conjugation = get_possibilities(conjugation, Conjugation)
-        gender = get_possibilities(gender, Gender) + ["-"]
-        person = get_possibilities(person, Person)
-        tense = get_possibilities(tense, Tense) + ["-"]
-        mood = get_possibilities(mood, Mood)
-
-        columns: set[str] = set()
-        for n, c, g, p, t, m in product(number, conjugation, gender, person, tense, mood):
-            columns.add(
-                f"{n.name}_{c.name}_{g.name if not isinstance(g, str) else g}_{Person.to_number(p)}_{t.name if not isinstance(t, str) else t}_{m.name}")
-
-        columns.intersection_update(self.verbs.columns)
-
-        if word is not None:  # used in suggesting fixes
-            rows_with_word = self.verbs[(self.verbs == word).any(axis=1)]
-            return [Word.from_str(v, k, WordType.VERB) for k, col in rows_with_word[list(columns)].items() for v in col]
-
-        if base is not _Unset:
-            return [Word.from_str(v, k, WordType.VERB) for k, v in self.verbs.loc[base][list(columns)].items()]
-        else:
-            return [Word.from_str(v, k, WordType.VERB) for k, col in self.verbs[list(columns)].items() for v in col]
+        # the base form column has no number, so it's never selected
+        possibilities = dict(number=get_possibilities(number, Number),
+                             conjugation=get_possibilities(conjugation, Conjugation),
+                             gender=get_possibilities(gender, Gender) + [None],
+                             person=get_possibilities(person, Person),
+                             tense=get_possibilities(tense, Tense) + [None],
+                             mood=get_possibilities(mood, Mood))
+
+        def query() -> list[Word]:
+            rows = None
+            if word is not None:  # used in suggesting fixes
+                rows = self.table.rows_of(self.strings.find(word))
+            elif base is not _Unset:
+                rows = self.base_rows(base)
+            return select(self.pool, rows, **possibilities)
+
+        key = (word, tuple(get_possibilities(base, str)) if base is not _Unset else None,
+               *map(tuple, possibilities.values()))
+        return cached(self.cache, key, query)
+
+    def base_rows(self, base: str | list[str]) -> list[int]:
+        rows: list[int] = list()
+        for b in get_possibilities(base, str):
+            rows.extend(self.lemma_index.rows(self.strings.find(b)))
+        return rows
 
 
 class Adjectives:
-    adjectives: pd.DataFrame
+    table: PartTable
+    strings: StringTable
+    pool: WordPool
+    lemma_index: LemmaIndex
+    cache: LRUCache  # get() results, a freshly loaded lexicon starts with an empty one
 
     @classmethod
-    def from_file(cls):
+    def from_file(cls, lexicon_file: LexiconFile | None = None):
+        lexicon_file = lexicon_file or get_lexicon_file()
         instance = cls()
-        instance.adjectives = pd.read_csv(f"{module_dir}/adjectives.csv")
+        instance.table = lexicon_file.part("adjective")
+        instance.strings = lexicon_file.strings
+        instance.pool = WordPool(instance.table, instance.strings)
+        instance.lemma_index = LemmaIndex(instance.pool, WordType.ADJECTIVE)
+        instance.cache = LRUCache(QUERY_CACHE_SIZE)
         return instance
 
+    @property
+    def adjectives(self) -> pd.DataFrame:
+        return to_frame(self.table, self.strings)
+
     def get_one(self, word: str) -> Word | None:
-        columns_with_word = next(iter(self.adjectives.columns[(self.adjectives == word).any()].tolist()),None)  # TODO it can match multiple columns
-        return Word.from_str(word, columns_with_word, WordType.ADJECTIVE) if columns_with_word is not None else None
+        analyses = self.pool.analyses(self.strings.find(word))
+        return analyses[0] if analyses else None
 
     def get_all(self, word: str) -> list[Word]:
-        columns_with_word = self.adjectives.columns[(self.adjectives == word).any()].tolist()
-        return [Word.from_str(word, c, WordType.ADJECTIVE) for c in columns_with_word]
+        return self.pool.analyses(self.strings.find(word))
+
+    def get_lemmas(self, word: str) -> list[Word]:
+        """Lemmas of every paradigm holding the word."""
+        return self.lemma_index.lemmas(self.strings.find(word))
+
+    def get_paradigm(self, lemma: str) -> list[Word]:
+        """Every form of the lemma."""
+        return self.lemma_index.paradigm(self.strings.find(lemma))
 
     def get(
             self,
@@ -260,37 +543,55 @@ class Adjectives:
             tense: Tense | list[Tense] | _Unset = _Unset,
             mood: Mood | list[Mood] | _Unset = _Unset
     ) -> list[Word] | None:
-        number = get_possibilities(number, Number)
-        conjugation = get_possibilities(conjugation, Conjugation)
-        gender = get_possibilities(gender, Gender)
+        possibilities = dict(number=get_possibilities(number, Number),
+                             conjugation=get_possibilities(conjugation, Conjugation),
+                             gender=get_possibilities(gender, Gender))
 
-        columns: list[str] = list()
-        for n, c, g in product(number, conjugation, gender):
-            columns.append(f"{n.name}_{c.name}_{g.name}")
+        def query() -> list[Word]:
+            if word is not None:  # used in suggesting fixes
+                rows_with_word = self.table.rows_of(self.strings.find(word))
+                return select(self.pool, rows_with_word, **possibilities)
+            return list(set(select(self.pool, None, **possibilities)))
 
-        if word is not None:  # used in suggesting fixes
-            rows_with_word = self.adjectives[(self.adjectives == word).any(axis=1)]
-            return [Word.from_str(v, k, WordType.ADJECTIVE) for k, col in rows_with_word[columns].items() for v in col]
-
-        return list({Word.from_str(v, k, WordType.ADJECTIVE) for k, col in self.adjectives[columns].items() for v in col})
+        return cached(self.cache, (word, *map(tuple, possibilities.values())), query)
 
 
 class Pronouns:
-    pronouns: pd.DataFrame
+    table: PartTable
+    strings: StringTable
+    pool: WordPool
+    lemma_index: LemmaIndex
+    cache: LRUCache  # get() results, a freshly loaded lexicon starts with an empty one
 
     @classmethod
-    def from_file(cls):
+    def from_file(cls, lexicon_file: LexiconFile | None = None):
+        lexicon_file = lexicon_file or get_lexicon_file()
         instance = cls()
-        instance.pronouns = pd.read_csv(f"{module_dir}/pronouns.csv")
+        instance.table = lexicon_file.part("pronoun")
+        instance.strings = lexicon_file.strings
+        instance.pool = WordPool(instance.table, instance.strings)
+        instance.lemma_index = LemmaIndex(instance.pool, WordType.PRONOUN)
+        instance.cache = LRUCache(QUERY_CACHE_SIZE)
         return instance
 
+    @property
+    def pronouns(self) -> pd.DataFrame:
+        return to_frame(self.table, self.strings)
+
     def get_one(self, word: str) -> Word | None:
-        columns_with_word = next(iter(self.pronouns.columns[(self.pronouns == word).any()].tolist()),None)  # TODO it can match multiple columns
-        return Word.from_str(word, columns_with_word, WordType.PRONOUN) if columns_with_word is not None else None
+        analyses = self.pool.analyses(self.strings.find(word))
+        return analyses[0] if analyses else None
 
     def get_all(self, word: str) -> list[Word]:
-        columns_with_word = self.pronouns.columns[(self.pronouns == word).any()].tolist()
-        return [Word.from_str(word, c, WordType.PRONOUN) for c in columns_with_word]
+        return self.pool.analyses(self.strings.find(word))
+
+    def get_lemmas(self, word: str) -> list[Word]:
+        """Lemmas of every paradigm holding the word."""
+        return self.lemma_index.lemmas(self.strings.find(word))
+
+    def get_paradigm(self, lemma: str) -> list[Word]:
+        """Every form of the lemma."""
+        return self.lemma_index.paradigm(self.strings.find(lemma))
 
     def get(
             self,
@@ -304,19 +605,17 @@ class Pronouns:
             tense: Tense | list[Tense] | _Unset = _Unset,
             mood: Mood | list[Mood] | _Unset = _Unset
     ) -> list[Word] | None:
-        number = get_possibilities(number, Number)
-        conjugation = get_possibilities(conjugation, Conjugation)
-        gender = get_possibilities(gender, Gender)
-
-        columns: list[str] = list()
-        for n, c, g in product(number, conjugation, gender):
-            columns.append(f"{n.name}_{c.name}_{g.name}")
+        possibilities = dict(number=get_possibilities(number, Number),
+                             conjugation=get_possibilities(conjugation, Conjugation),
+                             gender=get_possibilities(gender, Gender))
 
-        if word is not None:  # used in suggesting fixes
-            rows_with_word = self.pronouns[(self.pronouns == word).any(axis=1)]
-            return [Word.from_str(v, k, WordType.PRONOUN) for k, col in rows_with_word[columns].items() for v in col]
+        def query() -> list[Word]:
+            if word is not None:  # used in suggesting fixes
+                rows_with_word = self.table.rows_of(self.strings.find(word))
+                return select(self.pool, rows_with_word, **possibilities)
+            return list(set(select(self.pool, None, **possibilities)))
 
-        return list({Word.from_str(v, k, WordType.PRONOUN) for k, col in self.pronouns[columns].items() for v in col})
+        return cached(self.cache, (word, *map(tuple, possibilities.values())), query)
 
 # nouns = Nouns.from_file()
 #
@@ -0,0 +1,154 @@
+"""
+Suggestions of a diagnostic, found when they are read.
+
+A rejection gives Suggestions instead of a list: a sequence which asks the grammar's suggester for
+its candidates the first time it is read and keeps the best few of them, the closest to the written
+word first, among equally close ones the likeliest after the word before it and then the most
+frequent in the corpus. Diagnostics nobody reads the suggestions of cost no lexicon query, and
+however many words of a large lexicon match, a diagnostic holds at most limit of them.
+
+The likelihoods come from the bigram counts of polish_bigrams.json, made into a SuccessorIndex
+once per process: the counts of the words following each word, and of every word. Ranking a
+candidate takes two dictionary lookups.
+"""
+from __future__ import annotations
+
+import heapq
+import json
+import os
+import sys
+from collections.abc import Sequence
+from itertools import count
+from threading import Lock
+from typing import Callable, Iterable
+
+from .speech_parts import Word
+
+SUGGESTIONS = 20  # kept by default, what the dashboard shows
+
+_index: SuccessorIndex | None = None
+_index_lock = Lock()
+
+
+class SuccessorIndex:
+    """Bigram counts by the first word of the pair, and the occurrences of every word counted from its pairs."""
+    __slots__ = ("successors", "frequencies", "followers")
+    NONE: dict[str, int] = dict()  # successors of a word the corpus doesn't know
+
+    def __init__(self, pairs: dict[str, int]):
+        self.successors: dict[str, dict[str, int]] = dict()
+        self.frequencies: dict[str, int] = dict()
+        for pair, n in pairs.items():
+            # the words are in many pairs, one string of each is kept
+            first, _, second = pair.partition("|")
+            first, second = sys.intern(first), sys.intern(second)
+            self.successors.setdefault(first, dict())[second] = n
+            self.frequencies[first] = self.frequencies.get(first, 0) + n
+            self.frequencies[second] = self.frequencies.get(second, 0) + n
+        self.followers = frozenset(w for successors in self.successors.values() for w in successors)
+
+    @classmethod
+    def from_file(cls, path: str | None = None) -> SuccessorIndex:
+        """The index of a JSON object of "first|second" pairs and their counts, polish_bigrams.json by default."""
+        with open(path or os.path.join(os.path.dirname(__file__), "polish_bigrams.json"), encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def scores(self, previous: str | None) -> dict[str, int]:
+        """Counts of the words following the previous word, by word."""
+        if previous is None:
+            return self.NONE
+        return self.successors.get(previous.lower(), self.NONE)
+
+
+def get_successor_index() -> SuccessorIndex:
+    """Get or make the index of the bundled bigrams. The first call reads them, later calls are free."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SuccessorIndex.from_file()
+        return _index
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance of the strings."""
+    if len(a) < len(b):
+        a, b = b, a
+    row = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        diagonal, row[0] = row[0], i
+        for j, y in enumerate(b, 1):
+            diagonal, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, diagonal + (x != y))
+    return row[-1]
+
+
+def rank(candidates: Iterable[tuple[int, Word]], limit: int = SUGGESTIONS, previous: str | None = None
+         ) -> list[Word]:
+    """
+    The limit best of the (edit distance, word) candidates, closest first, then the most frequent after the
+    previous word, then the most frequent, then in byte order, so every process picks the same ones. The
+    candidates are streamed through a heap of limit entries, never kept all at once.
+    """
+    index = get_successor_index()
+    successors, frequencies = index.scores(previous), index.frequencies
+    order = count()
+    best = heapq.nsmallest(limit, ((d, -successors.get(w.word, 0), -frequencies.get(w.word, 0), w.word, w.code,
+                                    next(order), w) for d, w in candidates))
+    return [w for *_, w in best]
+
+
+def shortlist(candidates: Iterable[tuple[int, Word]], limit: int = SUGGESTIONS) -> list[tuple[int, Word]]:
+    """
+    The candidates rank() may pick for any previous word: all which follow some word in the corpus, and the
+    limit best of the others, which follow none. Ranking the shortlist gives what ranking all of them would.
+    """
+    index = get_successor_index()
+    followers, frequencies = index.followers, index.frequencies
+    following = list()
+
+    def others():
+        for d, w in candidates:
+            if w.word in followers:
+                following.append((d, w))
+            else:
+                yield d, -frequencies.get(w.word, 0), w.word, w.code, w
+
+    best = heapq.nsmallest(limit, others())
+    return following + [(d, w) for d, *_, w in best]
+
+
+class Suggestions(Sequence):
+    """Words a diagnostic suggests, found by find() when first read. Reads like a list of them."""
+    __slots__ = ("_find", "_words")
+
+    def __init__(self, find: Callable[[], list[Word]]):
+        self._find = find
+        self._words: list[Word] | None = None
+
+    @property
+    def words(self) -> list[Word]:
+        words = self._words
+        if words is None:
+            # two threads reading at once both find them, the same words
+            find = self._find
+            words = self._words if find is None else find()
+            self._words, self._find = words, None  # let go of the parse state
+        return words
+
+    def __getitem__(self, index):
+        return self.words[index]
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __eq__(self, other):
+        return self.words == list(other) if isinstance(other, Sequence) else NotImplemented
+
+    def __repr__(self):
+        return repr(self.words)
+
+    def __reduce__(self):
+        # found where the diagnostic is made, e.g. in a worker process, and sent on as a plain list
+        return list, (self.words,)
@@ -0,0 +1,229 @@
+"""
+Prefix completion over every form of the lexicon.
+
+The forms are kept sorted by their UTF-8 bytes, so each node of a prefix trie, i.e. all forms
+starting with some prefix, is a contiguous range of the sorted order. Over that order sits a
+binary tree holding, for every range, the OR of the features of its forms, which is the feature
+mask of the trie node. A search only walks into ranges whose mask can match, so its cost depends
+on the prefix and on the number of results, not on the size of the lexicon.
+
+Fuzzy search runs the Levenshtein dynamic programming over the same implicit trie: one row per
+node, shared by all forms below it, and a node is left out as soon as its row can no longer reach
+the allowed distance. The children of a node are found through a min-tree over the number of bytes
+every form shares with the one before it: a child ends at the first form sharing less than its prefix.
+The walk is done in Python, node by node. While the forms matching the masks are few enough, a scan
+of them with the C Levenshtein distance (of the python-Levenshtein package) is much faster, so
+fuzzy scans them then, grouped by length and kept for the next searches with the same masks.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Iterator, TYPE_CHECKING
+
+from .cache import LRUCache
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from .binary_lexicon import StringTable
+
+# forms matching the masks up to which fuzzy scans them, past it the trie walk is faster and they'd take much memory
+SCAN_LIMIT = 200_000
+_TOO_MANY: dict = dict()  # cached for masks matching more forms than that
+
+
+class FormTrie:
+    def __init__(self, strings: StringTable, sorted_ids: np.ndarray, mask_tree: np.ndarray, lcp_tree: np.ndarray):
+        self.strings = strings
+        self._sorted_ids_array = sorted_ids
+        self._mask_tree_array = mask_tree
+        self._sorted_ids = memoryview(sorted_ids).cast("B").cast("i")
+        self._tree = memoryview(mask_tree).cast("B").cast("I")
+        self._lcp_tree = memoryview(lcp_tree)
+        self._n_leaves = len(mask_tree) // 2
+        # forms of the last few masks fuzzy scanned, by length
+        self._scans = LRUCache(8)
+
+    def __len__(self) -> int:
+        return len(self._sorted_ids)
+
+    def form(self, position: int) -> str:
+        """Form at the position of the sorted order."""
+        return self.strings[self._sorted_ids[position]]
+
+    def range_mask(self, start: int, end: int) -> int:
+        """OR of the features of the forms in the range of the sorted order."""
+        tree = self._tree
+        mask = 0
+        start += self._n_leaves
+        end += self._n_leaves
+        while start < end:
+            if start & 1:
+                mask |= tree[start]
+                start += 1
+            if end & 1:
+                end -= 1
+                mask |= tree[end]
+            start //= 2
+            end //= 2
+        return mask
+
+    def prefix_range(self, prefix: str) -> tuple[int, int]:
+        """Range of the sorted order holding the forms starting with the prefix."""
+        # a lone surrogate encodes to bytes no stored form has, its range is empty
+        key = prefix.encode("utf-8", "surrogatepass")
+        start = bisect_left(self._sorted_ids, key, key=self.strings.key)
+        # 0xff never occurs in UTF-8, so it sorts after every continuation of the prefix
+        end = bisect_left(self._sorted_ids, key + b"\xff", lo=start, key=self.strings.key)
+        return start, end
+
+    def search(self, prefix: str, masks: list[int]) -> Iterator[int]:
+        """
+        Ids of the strings starting with the prefix which share a bit with every mask, in byte order.
+        A string matches when some of its columns together cover the masks, callers check single columns.
+        """
+        start, end = self.prefix_range(prefix)
+        if start >= end:
+            return
+        tree = self._tree
+        stack = [(1, 0, self._n_leaves)]  # node, first and past the last leaf below it
+        while stack:
+            node, first, last = stack.pop()
+            if last <= start or first >= end:
+                continue
+            mask = tree[node]
+            if not all(mask & m for m in masks):
+                continue
+            if last - first == 1:
+                yield self._sorted_ids[first]
+                continue
+            middle = (first + last) // 2
+            stack.append((2 * node + 1, middle, last))
+            stack.append((2 * node, first, middle))
+
+    def next_break(self, position: int, shared: int) -> int:
+        """First position after the given one whose form shares at most `shared` bytes with the form before it."""
+        tree = self._lcp_tree
+        n_leaves = self._n_leaves
+        if position + 1 >= len(self):
+            return len(self)
+        node = position + 1 + n_leaves
+        # step to the subtrees right of the position until one holds a break, then take its first leaf
+        while tree[node] > shared:
+            while node & 1:
+                node >>= 1
+            if not node:
+                return len(self)
+            node += 1
+        while node < n_leaves:
+            node = 2 * node if tree[2 * node] <= shared else 2 * node + 1
+        return min(node - n_leaves, len(self))
+
+    def fuzzy(self, word: str, distance: int, masks: list[int]) -> Iterator[tuple[int, int]]:
+        """
+        (string id, edit distance) of the strings within the distance from the word which share a bit
+        with every mask, in byte order.
+        """
+        try:
+            from Levenshtein import distance as levenshtein
+        except ImportError:
+            return self._walk(word, distance, masks)
+        key = tuple(masks)
+        by_length = self._scans.get(key)
+        if by_length is None:
+            by_length = self._by_length(masks)
+            self._scans.put(key, by_length)
+        if by_length is _TOO_MANY:
+            return self._walk(word, distance, masks)
+
+        found = list()
+        for length in range(len(word) - distance, len(word) + distance + 1):
+            if length in by_length:
+                order, ids, forms = by_length[length]
+                found.extend((order[i], ids[i], d) for i, form in enumerate(forms)
+                             if (d := levenshtein(word, form, score_cutoff=distance)) <= distance)
+        found.sort()
+        return iter([(string_id, d) for _, string_id, d in found])
+
+    def _by_length(self, masks: list[int]) -> dict[int, tuple[list[int], list[int], list[str]]]:
+        """Position in the byte order, id and form of every form matching the masks, by length."""
+        import numpy as np
+
+        leaves = self._mask_tree_array[self._n_leaves:self._n_leaves + len(self)]
+        matching = np.ones(len(leaves), dtype=bool)
+        for mask in masks:
+            matching &= (leaves & mask) != 0
+        positions = np.flatnonzero(matching)
+        if len(positions) > SCAN_LIMIT:
+            return _TOO_MANY
+        by_length = dict()
+        strings = self.strings
+        for position, string_id in zip(positions.tolist(), self._sorted_ids_array[positions].tolist()):
+            form = strings[string_id]
+            order, ids, forms = by_length.setdefault(len(form), (list(), list(), list()))
+            order.append(position)
+            ids.append(string_id)
+            forms.append(form)
+        return by_length
+
+    def _walk(self, word: str, distance: int, masks: list[int]) -> Iterator[tuple[int, int]]:
+        """fuzzy() by the Levenshtein dynamic programming over the trie."""
+        if not len(self):
+            return
+        tree = self._tree
+        n_leaves = self._n_leaves
+        ids = self._sorted_ids
+        strings = self.strings
+        width = len(word) + 1
+        over = distance + 1
+
+        def advance(row: list[int], depth: int, character: str) -> list[int]:
+            # row of the prefix one character longer; cells further than the distance from the diagonal
+            # can only exceed it, they are kept at distance + 1
+            next_row = [over] * width
+            if depth < distance:
+                next_row[0] = depth + 1
+            for i in range(max(1, depth + 1 - distance), min(width - 1, depth + 1 + distance) + 1):
+                next_row[i] = min(next_row[i - 1] + 1, row[i] + 1, row[i - 1] + (word[i - 1] != character))
+            return next_row
+
+        # node of the implicit trie: prefix, its length in bytes, its row of edit distances to the
+        # prefixes of the word, its range
+        stack = [("", 0, [i if i <= distance else over for i in range(width)], 0, len(self))]
+        while stack:
+            prefix, shared, row, start, end = stack.pop()
+            depth = len(prefix)
+            form = strings[ids[start]]
+            if end - start == 1:
+                # a single form below, finish its row without walking the trie
+                for character in form[depth:]:
+                    row = advance(row, depth, character)
+                    depth += 1
+                    if min(row) > distance:
+                        break
+                else:
+                    if row[-1] <= distance and all(tree[n_leaves + start] & m for m in masks):
+                        yield ids[start], row[-1]
+                continue
+
+            position = start
+            # the prefix itself sorts first in its range
+            if len(form) == depth:
+                if row[-1] <= distance and all(tree[n_leaves + position] & m for m in masks):
+                    yield ids[position], row[-1]
+                position += 1
+
+            children = list()
+            while position < end:
+                if position != start:
+                    form = strings[ids[position]]
+                character = form[depth]
+                child_shared = shared + len(character.encode())
+                child_end = min(self.next_break(position, child_shared - 1), end)
+                child_row = advance(row, depth, character)
+                if min(child_row) <= distance:
+                    mask = self.range_mask(position, child_end)
+                    if all(mask & m for m in masks):
+                        children.append((prefix + character, child_shared, child_row, position, child_end))
+                position = child_end
+            stack.extend(reversed(children))